@@ -93,6 +93,9 @@ def api_request(endpoint, method="GET", data=None, files=None):
     headers = {}
     if st.session_state.token:
         headers["Authorization"] = f"Bearer {st.session_state.token}"
+    # Echo the time of our last write so reads right after it come from the primary database
+    if st.session_state.get("last_write"):
+        headers["X-Last-Write"] = st.session_state.last_write
     
     url = f"{API_URL}{endpoint}"
     
@@ -108,6 +111,9 @@ def api_request(endpoint, method="GET", data=None, files=None):
             response = requests.put(url, headers=headers, json=data)
         elif method == "DELETE":
             response = requests.delete(url, headers=headers)
+        
+        if response is not None and "X-Last-Write" in response.headers:
+            st.session_state.last_write = response.headers["X-Last-Write"]
             
         return response
     except Exception as e:
@@ -274,18 +280,28 @@ def sound_predictions_page():
     st.subheader("Recent Predictions")
     limit = st.slider("Number of predictions to show", 10, 100, 20)
     
+    # Page cursors (after_id values); None is the page with the newest predictions
+    if 'predictions_cursors' not in st.session_state:
+        st.session_state.predictions_cursors = [None]
+    
+    params = {"limit": limit}
+    if st.session_state.predictions_cursors[-1] is not None:
+        params["after_id"] = st.session_state.predictions_cursors[-1]
+    
     # Use cached predictions if available, otherwise use regular API request
-    if 'predictions_data' not in st.session_state or st.button("Refresh Predictions"):
+    if 'predictions_data' not in st.session_state or st.session_state.get('predictions_params') != params \
+            or st.button("Refresh Predictions"):
         with st.spinner("Loading..."):
             # Try to get from cache first
-            cached_data = cached_api_request(f"/audio/predictions?limit={limit}")
+            cached_data = cached_api_request("/audio/predictions", data=params)
             if cached_data:
                 st.session_state.predictions_data = cached_data
             else:
                 # Fallback to regular API request
-                response = api_request(f"/audio/predictions?limit={limit}")
+                response = api_request("/audio/predictions", data=params)
                 if response:
                     st.session_state.predictions_data = safe_get_json(response, {"count": 0, "predictions": []})
+            st.session_state.predictions_params = params
     
     # Use the data from session state
     data = st.session_state.get('predictions_data', {"count": 0, "predictions": []})
@@ -340,6 +356,17 @@ def sound_predictions_page():
             # Convert dataframe to HTML with custom styling
             st.write(df[columns_to_show].to_html(escape=False, index=False), unsafe_allow_html=True)
             
+            # Page navigation
+            col_newer, col_older = st.columns([1, 1])
+            with col_newer:
+                if len(st.session_state.predictions_cursors) > 1 and st.button("⬅️ Newer predictions"):
+                    st.session_state.predictions_cursors.pop()
+                    st.rerun()
+            with col_older:
+                if data.get("next_after_id") and st.button("Older predictions ➡️"):
+                    st.session_state.predictions_cursors.append(data["next_after_id"])
+                    st.rerun()
+            
             # Add Audio Player Element
             st.subheader("Audio Player")
             st.info("Click on 🔊 Play link next to any prediction to listen to the audio")
@@ -804,11 +831,19 @@ def user_management_page():
     if 'delete_user_id' not in st.session_state:
         st.session_state.delete_user_id = None
     
-    # Get users from the API
-    response = api_request("/auth/users")
+    # Page cursors (after_id values); None is the first page
+    if 'users_cursors' not in st.session_state:
+        st.session_state.users_cursors = [None]
+    
+    # Get users from the API, one page at a time
+    params = {"limit": 50}
+    if st.session_state.users_cursors[-1] is not None:
+        params["after_id"] = st.session_state.users_cursors[-1]
+    response = api_request("/auth/users", data=params)
     
     if response and response.status_code == 200:
-        users = safe_get_json(response, [])
+        users_page = safe_get_json(response, {})
+        users = users_page.get("users", [])
         
         # Kullanıcı listesi
         st.subheader("User List")
@@ -830,6 +865,17 @@ def user_management_page():
             # Tabloyu göster (index kullanmadan)
             st.dataframe(df[columns_to_display], use_container_width=True, hide_index=True)
             
+            # Page navigation
+            col_prev, col_next = st.columns([1, 1])
+            with col_prev:
+                if len(st.session_state.users_cursors) > 1 and st.button("⬅️ Previous page"):
+                    st.session_state.users_cursors.pop()
+                    st.rerun()
+            with col_next:
+                if users_page.get("next_after_id") and st.button("Next page ➡️"):
+                    st.session_state.users_cursors.append(users_page["next_after_id"])
+                    st.rerun()
+            
             # Kullanıcı seçimi için selectbox
             current_username = st.session_state.username
             user_options = [(user["id"], user["username"]) for user in users]
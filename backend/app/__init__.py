@@ -1,12 +1,5 @@
 # Package initialization file
 
-import tensorflow as tf
-import logging
-from app.config import MODEL_OPTIMIZATION
-from app.configure_tensorflow import configure_tensorflow
-
-# Configure TensorFlow optimizations
-logger = logging.getLogger("sound-api")
-
-# This ensures TensorFlow is configured when the app is imported
-configure_tensorflow()
+# TensorFlow is configured by the modules that use it (app.model, app.training,
+# app.model_inspection) rather than here, so processes that only need light
+# modules, like the trainer's spectrogram workers, don't load TensorFlow.
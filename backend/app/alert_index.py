@@ -0,0 +1,329 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from math import floor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import ALERT_INDEX
+from app.database import get_db, get_live_alerts, count_live_alerts, calculate_distance, Alert
+from app.geo import bounding_box
+from app.models.alerts import AlertResponse
+
+logger = logging.getLogger("sound-api")
+
+class _LiveEntry:
+    """An indexed alert: its coordinates, filter fields, known reporters and response snapshot"""
+    __slots__ = ("alert_id", "latitude", "longitude", "class_id", "created_at", "last_reported_at",
+                 "evict_at", "cell", "reporters", "response")
+
+    def __init__(self, alert: Alert, evict_at: datetime, cell: Tuple[int, int], reporters: Set[str]):
+        self.alert_id = alert.id
+        self.latitude = alert.latitude
+        self.longitude = alert.longitude
+        self.class_id = alert.class_id
+        self.created_at = alert.created_at
+        self.last_reported_at = alert.last_reported_at or alert.created_at
+        self.evict_at = evict_at
+        self.cell = cell
+        self.reporters = reporters
+        self.response = AlertResponse.from_orm(alert)
+
+class LiveAlertIndex:
+    """
+    In-memory grid index of the alerts created within the live window.
+
+    Alerts are bucketed into cells of cell_degrees x cell_degrees, so a
+    radius query only looks at the cells its bounding box overlaps. Entries
+    are evicted when they expire or leave the window. A background thread
+    picks up alerts written by other processes (by ID) and periodically
+    compares the number of live alerts with the database, reloading the
+    index when they differ.
+    """
+
+    def __init__(self, window_hours: float, cell_degrees: float,
+                 sync_interval: float, consistency_check_interval: float):
+        self.window_hours = window_hours
+        self.cell_degrees = cell_degrees
+        self.sync_interval = sync_interval
+        self.consistency_check_interval = consistency_check_interval
+
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[int, int], Dict[int, _LiveEntry]] = {}
+        self._entries: Dict[int, _LiveEntry] = {}
+        self._evictions: List[Tuple[datetime, int]] = []  # heap of (evict_at, alert_id)
+        self._max_id = 0
+        self._last_sync: Optional[datetime] = None
+        self._ready = False
+
+        self._listeners: List[Callable[[List[AlertResponse]], None]] = []
+        self._position_listeners: List[Callable[[List[Tuple[float, float]]], None]] = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {"queries": 0, "syncs": 0, "reloads": 0, "inconsistencies": 0, "evicted": 0}
+
+    def start(self) -> None:
+        """Load the live alerts and start the background sync thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.reload()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-index-sync")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Live alert index started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background sync thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info("Live alert index stopped")
+
+    def reload(self) -> bool:
+        """Rebuild the index from the database, returns False if loading failed"""
+        loaded_at = datetime.utcnow()
+        db = get_db()
+        try:
+            cutoff = loaded_at - timedelta(hours=self.window_hours)
+            # Keep the current index if the database can't be reached
+            if count_live_alerts(db, cutoff) is None:
+                return False
+            alerts = get_live_alerts(db, cutoff)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._cells = {}
+            self._entries = {}
+            self._evictions = []
+            self._max_id = 0
+            for alert in alerts:
+                self._add_locked(alert)
+            self._last_sync = loaded_at
+            self._ready = True
+            self._stats["reloads"] += 1
+            size = len(self._entries)
+
+        logger.info(f"Loaded {size} live alerts into the alert index")
+        return True
+
+    def add(self, alert: Alert, reporter_device_id: Optional[str] = None) -> None:
+        """
+        Index a new or updated alert (its alert_class must be loaded)
+
+        reporter_device_id is a device known to have reported the alert, e.g. one just merged into it.
+        """
+        with self._lock:
+            self._add_locked(alert, reporter_device_id)
+
+    def find_mergeable(self, class_id: int, latitude: float, longitude: float, radius_km: float,
+                       reported_after: datetime) -> Optional[Tuple[int, Set[str], float, float]]:
+        """
+        Find the nearest alert of a class within radius_km of a point that was
+        last reported after a time
+
+        Returns (alert_id, device IDs that reported it, latitude, longitude) or None.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        min_row, min_col = self._cell_of(min_lat, min_lon)
+        max_row, max_col = self._cell_of(max_lat, max_lon)
+
+        best = None
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    for entry in self._cells.get((row, col), {}).values():
+                        if entry.class_id != class_id or entry.last_reported_at < reported_after:
+                            continue
+                        distance = calculate_distance(latitude, longitude, entry.latitude, entry.longitude)
+                        if distance <= radius_km and (best is None or distance < best[0]):
+                            best = (distance, entry.alert_id, set(entry.reporters),
+                                    entry.latitude, entry.longitude)
+        return best[1:] if best else None
+
+    def is_ready(self) -> bool:
+        """Check whether the index has been loaded"""
+        return self._ready
+
+    def add_listener(self, callback: Callable[[List[AlertResponse]], None]) -> None:
+        """Call callback from the sync thread with alerts picked up from other processes"""
+        self._listeners.append(callback)
+
+    def add_position_listener(self, callback: Callable[[List[Tuple[float, float]]], None]) -> None:
+        """
+        Call callback from the sync thread with the (latitude, longitude) points of alerts
+        other processes created or changed, including the old position of merged alerts
+        """
+        self._position_listeners.append(callback)
+
+    def can_serve(self, hours_ago: Optional[float]) -> bool:
+        """Check whether a query for alerts of the last hours_ago hours can be answered from memory"""
+        return self.is_ready() and hours_ago is not None and hours_ago <= self.window_hours
+
+    def query(self, latitude: float, longitude: float, radius_km: float,
+              class_ids: Optional[List[int]] = None, hours_ago: float = 0) -> List[AlertResponse]:
+        """Get live alerts within a radius of a point, nearest first"""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=hours_ago)
+        class_filter = set(class_ids) if class_ids else None
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        min_row, min_col = self._cell_of(min_lat, min_lon)
+        max_row, max_col = self._cell_of(max_lat, max_lon)
+
+        with self._lock:
+            self._evict_locked(now)
+            self._stats["queries"] += 1
+
+            # Scan the whole index when the box covers more cells than there are alerts
+            cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+            if cell_count > len(self._entries):
+                candidates = list(self._entries.values())
+            else:
+                candidates = []
+                for row in range(min_row, max_row + 1):
+                    for col in range(min_col, max_col + 1):
+                        cell = self._cells.get((row, col))
+                        if cell:
+                            candidates.extend(cell.values())
+
+        results = []
+        for entry in candidates:
+            if entry.created_at < cutoff:
+                continue
+            if class_filter is not None and entry.class_id not in class_filter:
+                continue
+            distance = calculate_distance(latitude, longitude, entry.latitude, entry.longitude)
+            if distance <= radius_km:
+                results.append((distance, entry))
+
+        results.sort(key=lambda result: result[0])
+        return [entry.response.copy(update={"distance_km": distance}) for distance, entry in results]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["cells"] = len(self._cells)
+            stats["max_id"] = self._max_id
+            stats["ready"] = self._ready
+        stats["window_hours"] = self.window_hours
+        return stats
+
+    def _cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return floor(latitude / self.cell_degrees), floor(longitude / self.cell_degrees)
+
+    def _add_locked(self, alert: Alert, reporter_device_id: Optional[str] = None) -> Optional[_LiveEntry]:
+        evict_at = alert.created_at + timedelta(hours=self.window_hours)
+        if alert.expires_at is not None and alert.expires_at < evict_at:
+            evict_at = alert.expires_at
+        if evict_at <= datetime.utcnow():
+            return None
+
+        previous = self._remove_locked(alert.id)
+        reporters = previous.reporters if previous is not None else {alert.device_id}
+        if reporter_device_id is not None:
+            reporters.add(reporter_device_id)
+        entry = _LiveEntry(alert, evict_at, self._cell_of(alert.latitude, alert.longitude), reporters)
+        self._cells.setdefault(entry.cell, {})[entry.alert_id] = entry
+        self._entries[entry.alert_id] = entry
+        heapq.heappush(self._evictions, (evict_at, entry.alert_id))
+        self._max_id = max(self._max_id, entry.alert_id)
+        return entry
+
+    def _remove_locked(self, alert_id: int) -> Optional[_LiveEntry]:
+        entry = self._entries.pop(alert_id, None)
+        if entry is not None:
+            cell = self._cells[entry.cell]
+            del cell[alert_id]
+            if not cell:
+                del self._cells[entry.cell]
+        return entry
+
+    def _evict_locked(self, now: datetime) -> None:
+        while self._evictions and self._evictions[0][0] <= now:
+            evict_at, alert_id = heapq.heappop(self._evictions)
+            entry = self._entries.get(alert_id)
+            # Skip heap items left behind when an alert was re-indexed
+            if entry is not None and entry.evict_at == evict_at:
+                self._remove_locked(alert_id)
+                self._stats["evicted"] += 1
+
+    def _run(self) -> None:
+        last_check = time.monotonic()
+        while not self._stop_event.wait(self.sync_interval):
+            try:
+                self._sync()
+                if time.monotonic() - last_check >= self.consistency_check_interval:
+                    self._check_consistency()
+                    last_check = time.monotonic()
+            except Exception as e:
+                logger.error(f"Live alert index sync failed: {str(e)}")
+
+    def _sync(self) -> None:
+        """Index alerts created or merged since the last sync, e.g. by other worker processes"""
+        with self._lock:
+            after_id = self._max_id
+            # Overlap with the previous sync so reports committed late are not missed
+            reported_after = self._last_sync - timedelta(seconds=self.sync_interval) if self._last_sync else None
+        sync_started = datetime.utcnow()
+        db = get_db()
+        try:
+            alerts = get_live_alerts(db, sync_started - timedelta(hours=self.window_hours), after_id, reported_after)
+        finally:
+            db.close()
+
+        new_alerts = []
+        positions = []
+        with self._lock:
+            for alert in alerts:
+                previous = self._entries.get(alert.id)
+                entry = self._add_locked(alert)
+                if entry is None:
+                    continue
+                if previous is None:
+                    new_alerts.append(entry.response)
+                    positions.append((entry.latitude, entry.longitude))
+                elif previous.response != entry.response:
+                    # Merged elsewhere: the alert may have moved away from where it was cached
+                    positions.append((previous.latitude, previous.longitude))
+                    positions.append((entry.latitude, entry.longitude))
+            self._last_sync = sync_started
+            self._stats["syncs"] += 1
+
+        if new_alerts:
+            for callback in self._listeners:
+                callback(new_alerts)
+        if positions:
+            for callback in self._position_listeners:
+                callback(positions)
+
+    def _check_consistency(self) -> None:
+        """Reload the index if it doesn't hold the same number of live alerts as the database"""
+        db = get_db()
+        try:
+            expected = count_live_alerts(db, datetime.utcnow() - timedelta(hours=self.window_hours))
+        finally:
+            db.close()
+        if expected is None:
+            return
+
+        with self._lock:
+            self._evict_locked(datetime.utcnow())
+            actual = len(self._entries)
+        if actual != expected:
+            with self._lock:
+                self._stats["inconsistencies"] += 1
+            logger.warning(f"Live alert index holds {actual} alerts, database has {expected}; reloading")
+            self.reload()
+
+# Shared index, started and stopped by the application lifespan
+live_alert_index = LiveAlertIndex(
+    window_hours=ALERT_INDEX["window_hours"],
+    cell_degrees=ALERT_INDEX["cell_degrees"],
+    sync_interval=ALERT_INDEX["sync_interval_seconds"],
+    consistency_check_interval=ALERT_INDEX["consistency_check_interval_seconds"]
+)
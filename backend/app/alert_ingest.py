@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ALERT_RETENTION, ALERT_DEDUP
+from app.database import (
+    create_alert_async, merge_alert_report_async, get_alert_async, find_mergeable_alert_async,
+    alert_class_lock, Alert, NotifiableClass
+)
+from app.alert_index import live_alert_index
+from app.alert_subscriptions import alert_hub
+from app.class_catalog import class_catalog
+from app.nearby_cache import nearby_cache
+from app.models.alerts import AlertResponse
+
+logger = logging.getLogger("sound-api")
+
+# Reports of one class are ingested one at a time in this process, so concurrent
+# reports of the same sound see each other in the live alert index
+_class_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+async def ingest_alert(db: AsyncSession, user_id: Optional[int], notifiable_class: NotifiableClass,
+                       latitude: float, longitude: float, confidence: float,
+                       device_id: str) -> Optional[Alert]:
+    """
+    Store a report of a notifiable sound and announce it
+
+    A report of the same class close to a recently reported alert is merged
+    into that alert; a repeated report from the same device leaves it
+    unchanged. Otherwise a new alert is created, added to the live alert
+    index and pushed to subscribers in the area. Returns None if the report
+    could not be stored.
+
+    Across worker processes, ingestion of a class is serialised with a MySQL
+    named lock. When the live alert index (which learns about other
+    processes' alerts a sync interval late) has no match, the database is
+    checked before creating an alert. The alert_reporters table makes each
+    device count once per alert.
+    """
+    # Set expiration time (default: 1 hour from now)
+    expires_at = datetime.utcnow() + timedelta(hours=ALERT_RETENTION["default_ttl_hours"])
+
+    # Merging needs the live alert index to find recent alerts
+    if not ALERT_DEDUP["enabled"] or not live_alert_index.is_ready():
+        return await _create_alert(
+            db, user_id, notifiable_class, latitude, longitude, confidence, device_id, expires_at
+        )
+
+    class_id = notifiable_class.id
+    async with _class_locks[class_id], alert_class_lock(class_id, ALERT_DEDUP["lock_timeout_seconds"]):
+        reported_after = datetime.utcnow() - timedelta(seconds=ALERT_DEDUP["window_seconds"])
+        match = live_alert_index.find_mergeable(
+            class_id, latitude, longitude, ALERT_DEDUP["radius_km"], reported_after
+        )
+        if match is None:
+            found = await find_mergeable_alert_async(
+                db, class_id, latitude, longitude, ALERT_DEDUP["radius_km"], reported_after
+            )
+            if found is not None:
+                alert_id, old_latitude, old_longitude = found
+                match = (alert_id, set(), old_latitude, old_longitude)
+
+        if match is not None:
+            alert_id, reporters, old_latitude, old_longitude = match
+            if device_id in reporters:
+                alert = await get_alert_async(db, alert_id)
+            else:
+                alert, merged = await merge_alert_report_async(
+                    db, alert_id, latitude, longitude, confidence, device_id, expires_at
+                )
+                if alert is not None:
+                    live_alert_index.add(alert, reporter_device_id=device_id)
+                if merged:
+                    # Cached areas around the old centroid still show the alert there
+                    nearby_cache.invalidate(old_latitude, old_longitude)
+                    nearby_cache.invalidate(alert.latitude, alert.longitude)
+                    logger.info(f"Merged report from {device_id} into alert {alert_id} "
+                                f"({alert.reporter_count} reporters)")
+            if alert is not None:
+                return alert
+
+        return await _create_alert(
+            db, user_id, notifiable_class, latitude, longitude, confidence, device_id, expires_at
+        )
+
+async def _create_alert(db: AsyncSession, user_id: Optional[int], notifiable_class: NotifiableClass,
+                        latitude: float, longitude: float, confidence: float, device_id: str,
+                        expires_at: datetime) -> Optional[Alert]:
+    alert = await create_alert_async(
+        db=db,
+        user_id=user_id,
+        class_id=notifiable_class.id,
+        latitude=latitude,
+        longitude=longitude,
+        confidence=confidence,
+        device_id=device_id,
+        expires_at=expires_at
+    )
+    if alert is None:
+        return None
+
+    # Make the alert visible to /alerts/nearby in this process right away
+    live_alert_index.add(alert)
+    nearby_cache.invalidate(alert.latitude, alert.longitude)
+
+    # Push it to subscribers in the area
+    alert_hub.publish(AlertResponse.from_orm(alert))
+    return alert
+
+async def alert_from_prediction(db: AsyncSession, user_id: int, class_name: str, confidence: float,
+                                latitude: float, longitude: float, device_id: str) -> Optional[Alert]:
+    """
+    Create an alert for a prediction if its class is an active notifiable class
+    and the confidence reaches the class threshold, otherwise return None
+    """
+    notifiable_class = await class_catalog.get_by_name(class_name)
+    if notifiable_class is None or not notifiable_class.is_active:
+        return None
+    if confidence < notifiable_class.min_confidence:
+        return None
+
+    alert = await ingest_alert(db, user_id, notifiable_class, latitude, longitude, confidence, device_id)
+    if alert is not None:
+        logger.info(f"Created alert {alert.id} from a '{class_name}' prediction")
+    return alert
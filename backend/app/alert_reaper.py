@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Any, Dict
+
+from app.config import ALERT_RETENTION
+from app.database import get_db, archive_expired_alerts, purge_archived_alerts
+
+logger = logging.getLogger("sound-api")
+
+class AlertReaper:
+    """
+    Background thread that moves expired alerts to alerts_archive.
+
+    Keeping only live alerts in the alerts table means radius queries cost
+    the same after months of operation. Archived alerts older than the
+    retention period are deleted.
+    """
+
+    def __init__(self, interval: float, batch_size: int, retention_days: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"runs": 0, "archived": 0, "purged": 0}
+
+    def start(self) -> None:
+        """Start the reaper thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-reaper")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Alert reaper started")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the reaper thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info("Alert reaper stopped")
+
+    def reap(self) -> Dict[str, int]:
+        """Archive all expired alerts and purge old archived ones, in batches"""
+        archived = 0
+        purged = 0
+        db = get_db()
+        try:
+            while not self._stop_event.is_set():
+                count = archive_expired_alerts(db, self.batch_size)
+                archived += count
+                if count < self.batch_size:
+                    break
+
+            if self.retention_days > 0:
+                while not self._stop_event.is_set():
+                    count = purge_archived_alerts(db, self.retention_days, self.batch_size)
+                    purged += count
+                    if count < self.batch_size:
+                        break
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self._stats["runs"] += 1
+            self._stats["archived"] += archived
+            self._stats["purged"] += purged
+        if archived or purged:
+            logger.info(f"Archived {archived} expired alerts, purged {purged} archived alerts")
+        return {"archived": archived, "purged": purged}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get reaper counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["retention_days"] = self.retention_days
+        return stats
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Alert reaper failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+# Shared reaper, started and stopped by the application lifespan
+alert_reaper = AlertReaper(
+    interval=ALERT_RETENTION["reap_interval_seconds"],
+    batch_size=ALERT_RETENTION["batch_size"],
+    retention_days=ALERT_RETENTION["archive_retention_days"]
+)
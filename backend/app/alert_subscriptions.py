@@ -0,0 +1,173 @@
+import asyncio
+import json
+from math import floor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.cache import TTLCache
+from app.config import ALERT_SUBSCRIPTIONS
+from app.database import calculate_distance
+from app.geo import bounding_box
+from app.models.alerts import AlertResponse
+
+class Subscriber:
+    """A WebSocket client waiting for alerts around a location"""
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.latitude: Optional[float] = None
+        self.longitude: Optional[float] = None
+        self.radius_km = 0.0
+        self.class_ids: Optional[Set[int]] = None
+        self.cells: List[Tuple[int, int]] = []
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+class AlertSubscriptionHub:
+    """
+    Pushes new alerts to the subscribers near them.
+
+    Subscribers are registered in every grid cell their radius overlaps, so
+    publishing an alert only looks at the subscribers of the alert's cell.
+    Each subscriber has a bounded outgoing queue drained by its own sender
+    task; a slow client has alerts dropped instead of delaying the others.
+    All methods except publish_threadsafe must be called on the event loop.
+    """
+
+    def __init__(self, cell_degrees: float, queue_size: int):
+        self.cell_degrees = cell_degrees
+        self.queue_size = queue_size
+
+        self._cells: Dict[Tuple[int, int], Set[Subscriber]] = {}
+        self._subscribers: Set[Subscriber] = set()
+        self._by_user: Dict[int, Set[Subscriber]] = {}
+        self._published = TTLCache(max_entries=10000, ttl_seconds=600)  # alert IDs already pushed
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0, "send_failures": 0}
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop publish_threadsafe hands alerts to"""
+        self._loop = loop
+
+    def subscribe(self, websocket: WebSocket, user_id: int) -> Subscriber:
+        """Register a connected client; it receives alerts once it has a location"""
+        subscriber = Subscriber(websocket, user_id, self.queue_size)
+        self._subscribers.add(subscriber)
+        self._by_user.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remove a disconnected client"""
+        self._remove_from_cells(subscriber)
+        self._subscribers.discard(subscriber)
+        user_subscribers = self._by_user.get(subscriber.user_id)
+        if user_subscribers is not None:
+            user_subscribers.discard(subscriber)
+            if not user_subscribers:
+                del self._by_user[subscriber.user_id]
+
+    def locate(self, subscriber: Subscriber, latitude: float, longitude: float,
+               radius_km: Optional[float] = None, class_ids: Optional[Iterable[int]] = None) -> None:
+        """Set or move the area a subscriber receives alerts for"""
+        self._remove_from_cells(subscriber)
+        subscriber.latitude = latitude
+        subscriber.longitude = longitude
+        if radius_km is not None:
+            subscriber.radius_km = radius_km
+            subscriber.class_ids = set(class_ids) if class_ids else None
+
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, subscriber.radius_km)
+        min_row, min_col = self._cell_of(min_lat, min_lon)
+        max_row, max_col = self._cell_of(max_lat, max_lon)
+        subscriber.cells = [
+            (row, col) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)
+        ]
+        for cell in subscriber.cells:
+            self._cells.setdefault(cell, set()).add(subscriber)
+
+    def move_user(self, user_id: int, latitude: float, longitude: float) -> None:
+        """Move every subscription of a user, e.g. after a location update over HTTP"""
+        for subscriber in list(self._by_user.get(user_id, ())):
+            if subscriber.latitude is not None:
+                self.locate(subscriber, latitude, longitude)
+
+    def send(self, subscriber: Subscriber, message: Dict[str, Any]) -> bool:
+        """Queue a JSON message for a subscriber, returns False if its queue is full"""
+        return self._enqueue(subscriber, json.dumps(message))
+
+    def _enqueue(self, subscriber: Subscriber, text: str) -> bool:
+        try:
+            subscriber.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            subscriber.dropped += 1
+            self._stats["dropped"] += 1
+            return False
+
+    def publish(self, alert: AlertResponse) -> int:
+        """Queue an alert for every subscriber whose area contains it, returns the number of recipients"""
+        if self._published.get(alert.id) is not None:
+            return 0
+        self._published.set(alert.id, True)
+        self._stats["published"] += 1
+
+        recipients = 0
+        for subscriber in list(self._cells.get(self._cell_of(alert.latitude, alert.longitude), ())):
+            if subscriber.class_ids is not None and alert.class_id not in subscriber.class_ids:
+                continue
+            distance = calculate_distance(subscriber.latitude, subscriber.longitude, alert.latitude, alert.longitude)
+            if distance > subscriber.radius_km:
+                continue
+
+            text = '{"type": "alert", "alert": ' + alert.copy(update={"distance_km": distance}).json() + "}"
+            if self._enqueue(subscriber, text):
+                recipients += 1
+        self._stats["delivered"] += recipients
+        return recipients
+
+    def publish_threadsafe(self, alerts: List[AlertResponse]) -> None:
+        """Publish alerts from another thread, such as the live alert index sync"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        for alert in alerts:
+            self._loop.call_soon_threadsafe(self.publish, alert)
+
+    async def run_sender(self, subscriber: Subscriber) -> None:
+        """Send queued messages to a subscriber until it disconnects"""
+        while True:
+            text = await subscriber.queue.get()
+            try:
+                await subscriber.websocket.send_text(text)
+            except (WebSocketDisconnect, RuntimeError):
+                # The client went away mid-send (RuntimeError: the socket is already closed);
+                # stop pushing alerts to it without waiting for the receive loop to notice
+                self._stats["send_failures"] += 1
+                self.unsubscribe(subscriber)
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscriber counts and delivery counters"""
+        stats = dict(self._stats)
+        stats["subscribers"] = len(self._subscribers)
+        stats["located_subscribers"] = sum(1 for subscriber in self._subscribers if subscriber.cells)
+        stats["cells"] = len(self._cells)
+        return stats
+
+    def _cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return floor(latitude / self.cell_degrees), floor(longitude / self.cell_degrees)
+
+    def _remove_from_cells(self, subscriber: Subscriber) -> None:
+        for cell in subscriber.cells:
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self._cells[cell]
+        subscriber.cells = []
+
+# Shared hub used by /alerts/subscribe and the alert creation paths
+alert_hub = AlertSubscriptionHub(
+    cell_degrees=ALERT_SUBSCRIPTIONS["cell_degrees"],
+    queue_size=ALERT_SUBSCRIPTIONS["queue_size"]
+)
@@ -1,19 +1,23 @@
 from app.auth.auth import (
     authenticate_user,
+    authenticate_user_async,
     create_access_token,
     get_current_user,
     get_current_active_user,
     get_optional_current_user,
+    get_user_from_token,
     check_admin_privilege,
     check_super_admin_privilege
 )
 
 __all__ = [
     "authenticate_user",
+    "authenticate_user_async",
     "create_access_token",
     "get_current_user",
     "get_current_active_user",
     "get_optional_current_user",
+    "get_user_from_token",
     "check_admin_privilege",
     "check_super_admin_privilege"
 ]
\ No newline at end of file
@@ -4,9 +4,15 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, UserPrivilege
-from app.database import get_user_by_username, verify_password, get_db_session, User
+from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, UserPrivilege, PASSWORD_HASHING
+from app.database import (
+    get_user_by_username, get_user_by_username_async, update_password_hash_async,
+    verify_password, get_async_db_session, User
+)
+from app.password_hashing import password_hasher
+from app.user_cache import user_cache
 
 # OAuth2 Password Bearer token setup with auto_error=False to make it optional
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
@@ -30,6 +36,25 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     return user
 
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """
+    Authenticate a user with username and password, verifying the password off the event loop
+    
+    If the stored hash uses outdated cost settings it is replaced after a successful login.
+    """
+    user = await get_user_by_username_async(db, username)
+    if not user:
+        return None
+    
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    
+    if new_hash and PASSWORD_HASHING["rehash_on_login"]:
+        if await update_password_hash_async(db, user.id, new_hash):
+            user.hashed_password = new_hash
+    return user
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a new JWT access token
@@ -48,8 +73,39 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def get_cached_user(db: AsyncSession, username: str) -> Optional[User]:
+    """
+    Get a user by username, using the user cache before querying the database
+    """
+    user = user_cache.get(username)
+    if user is None:
+        user = await get_user_by_username_async(db, username)
+        if user is not None:
+            user_cache.put(user)
+    return user
+
+async def get_user_from_token(db: AsyncSession, token: Optional[str]) -> Optional[User]:
+    """
+    Get the user a JWT token belongs to, or None if the token is missing or invalid
+    """
+    if token is None:
+        return None
+    
+    try:
+        # Decode the JWT token
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        
+        if username is None:
+            return None
+        
+        # Get the user from the cache or the database
+        return await get_cached_user(db, username)
+    except JWTError:
+        return None
+
 async def get_current_user(
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     token: str = Depends(oauth2_scheme)
 ) -> User:
     """
@@ -76,37 +132,22 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    # Get the user from the database
-    user = get_user_by_username(db, token_data.username)
+    # Get the user from the cache or the database
+    user = await get_cached_user(db, token_data.username)
     if user is None:
         raise credentials_exception
     
     return user
 
 async def get_optional_current_user(
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     token: Optional[str] = Depends(oauth2_scheme_optional)
 ) -> Optional[User]:
     """
     Get the current user from the JWT token if available, otherwise return None.
     This allows endpoints to work with or without authentication.
     """
-    if token is None:
-        return None
-        
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            return None
-        
-        # Get the user from the database
-        user = get_user_by_username(db, username)
-        return user
-    except JWTError:
-        return None
+    return await get_user_from_token(db, token)
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import CLASS_CATALOG
+from app.database import get_db, NotifiableClass
+from app.models.alerts import NotifiableClassResponse
+
+logger = logging.getLogger("sound-api")
+
+class NotifiableClassCatalog:
+    """
+    In-process copy of the notifiable_classes table.
+
+    Classes are loaded in one query and kept as detached objects, together
+    with the serialized /alerts/classes responses and their ETags. The
+    catalog is invalidated when a class is created or updated through this
+    process; changes made through other processes are picked up after
+    refresh_seconds. ETags are content hashes, so all processes serving the
+    same data hand out the same ETag.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, NotifiableClass] = {}
+        self._by_name: Dict[str, NotifiableClass] = {}
+        self._responses: Dict[bool, Tuple[bytes, str]] = {}  # include_inactive -> (body, etag)
+        self._loaded_at: Optional[float] = None
+        self._generation = 0  # Bumped on invalidation, so a load racing with a write isn't kept as fresh
+        self._stats = {"loads": 0, "invalidations": 0}
+
+    def invalidate(self) -> None:
+        """Reload the catalog on next use"""
+        with self._lock:
+            self._loaded_at = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    async def get_by_id(self, class_id: int) -> Optional[NotifiableClass]:
+        """Get a notifiable class by ID"""
+        await self._ensure_loaded()
+        return self._by_id.get(class_id)
+
+    async def get_by_name(self, class_name: str) -> Optional[NotifiableClass]:
+        """Get a notifiable class by name"""
+        await self._ensure_loaded()
+        return self._by_name.get(class_name)
+
+    async def get_response(self, include_inactive: bool = False) -> Tuple[bytes, str]:
+        """Get the JSON body and ETag of the class list, with or without inactive classes"""
+        await self._ensure_loaded()
+        return self._responses[include_inactive]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog size and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["classes"] = len(self._by_id)
+            stats["age_seconds"] = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        return stats
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    async def _ensure_loaded(self) -> None:
+        if not self._is_fresh():
+            # The query runs in a worker thread so the event loop isn't blocked
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+
+    def load(self) -> None:
+        """Load all notifiable classes from the database"""
+        with self._lock:
+            generation = self._generation
+        db = get_db()
+        try:
+            classes = db.query(NotifiableClass).order_by(NotifiableClass.id).all()
+            db.expunge_all()
+        finally:
+            db.close()
+
+        rows = [json.loads(NotifiableClassResponse.from_orm(notifiable_class).json()) for notifiable_class in classes]
+        responses = {
+            True: self._serialize(rows),
+            False: self._serialize([row for row in rows if row["is_active"]])
+        }
+
+        with self._lock:
+            self._by_id = {notifiable_class.id: notifiable_class for notifiable_class in classes}
+            self._by_name = {notifiable_class.class_name: notifiable_class for notifiable_class in classes}
+            self._responses = responses
+            self._loaded_at = time.monotonic() if generation == self._generation else None
+            self._stats["loads"] += 1
+        logger.info(f"Loaded {len(classes)} notifiable classes into the catalog")
+
+    @staticmethod
+    def _serialize(rows: List[Dict[str, Any]]) -> Tuple[bytes, str]:
+        body = json.dumps(rows, separators=(",", ":")).encode("utf-8")
+        return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+# Shared catalog used by the alert routes
+class_catalog = NotifiableClassCatalog(refresh_seconds=CLASS_CATALOG["refresh_seconds"])
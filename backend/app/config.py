@@ -28,8 +28,33 @@ MODEL_OPTIMIZATION = {
     "gpu_memory_limit_mb": None     # Limit GPU memory usage (None = no limit)
 }
 
+# Training preprocessing caches (stored under the trainer's temp_dir and reused across training runs)
+TRAINING_CACHE = {
+    "spectrograms": os.getenv("TRAINING_SPECTROGRAM_CACHE", "1") == "1",  # Cache spectrograms by audio content hash
+    "features": os.getenv("TRAINING_FEATURE_CACHE", "1") == "1"           # Cache MobileNetV2 features (float16) by image hash
+}
+
+# Training preprocessing (audio decoding and spectrogram rendering run in a process pool)
+TRAINING_PREPROCESSING = {
+    "workers": int(os.getenv("TRAINING_WORKERS", "0")) or os.cpu_count() or 1,  # Worker processes, default one per core
+    "files_per_task": 8,                                                          # Files sent to a worker at a time
+    # Workers are started fresh ("spawn" or "forkserver"): forking the threaded,
+    # TensorFlow-initialized API process can deadlock the children on inherited locks
+    "start_method": os.getenv("TRAINING_START_METHOD", "spawn")
+}
+
+# Prediction logging settings (write-behind queue used by /audio/predict)
+PREDICTION_LOGGING = {
+    "max_rows": 100,                  # Number of latest predictions kept in the database (0 keeps all)
+    "queue_size": 1000,               # Maximum number of predictions waiting to be written
+    "batch_size": 50,                 # Flush as soon as this many predictions are queued
+    "flush_interval_seconds": 2.0,    # Flush queued predictions at least this often
+    "prune_interval_seconds": 60.0    # How often predictions beyond max_rows are deleted
+}
+
 # API settings
 ALLOWED_EXTENSIONS = (".wav",)
+MAX_BULK_EVALUATIONS = 500  # Maximum number of evaluations accepted by /audio/evaluations/bulk
 
 # Database settings
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -40,11 +65,124 @@ DB_NAME = os.getenv("DB_NAME", "guvenduy")
 # SQLAlchemy database URL
 DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
+# Async SQLAlchemy database URL, used by the request hot paths (requires aiomysql)
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+
+# Optional read replica for the read-only endpoints. Leave DB_READ_HOST unset to
+# send every query to the primary. Hosts may include a port (e.g. "127.0.0.1:3307").
+DB_READ_HOST = os.getenv("DB_READ_HOST", "")
+DB_READ_USER = os.getenv("DB_READ_USER", DB_USER)
+DB_READ_PASSWORD = os.getenv("DB_READ_PASSWORD", DB_PASSWORD)
+DB_READ_NAME = os.getenv("DB_READ_NAME", DB_NAME)
+
+READ_DATABASE_URL = f"mysql+mysqlconnector://{DB_READ_USER}:{DB_READ_PASSWORD}@{DB_READ_HOST}/{DB_READ_NAME}" if DB_READ_HOST else None
+ASYNC_READ_DATABASE_URL = f"mysql+aiomysql://{DB_READ_USER}:{DB_READ_PASSWORD}@{DB_READ_HOST}/{DB_READ_NAME}" if DB_READ_HOST else None
+
+# How /alerts/nearby finds alerts in a radius:
+# "bbox"    - bounding box on the latitude/longitude columns, exact distance checked in Python
+# "spatial" - MBRContains on the SPATIAL index of alerts.location, distance computed and sorted by MySQL
+ALERT_RADIUS_STRATEGY = os.getenv("ALERT_RADIUS_STRATEGY", "bbox")
+# alerts.location and its SPATIAL index (MySQL 8) only exist with the spatial strategy;
+# switching strategies adds or drops them at the next startup
+ALERT_SPATIAL_INDEX = ALERT_RADIUS_STRATEGY == "spatial"
+
+# In-memory index of recent alerts, used by /alerts/nearby for queries within the live window
+ALERT_INDEX = {
+    "enabled": os.getenv("ALERT_INDEX_ENABLED", "1") == "1",
+    "window_hours": 24,                          # Alerts younger than this are kept in memory
+    "cell_degrees": 0.05,                        # Grid cell size (about 5.5 km of latitude)
+    "sync_interval_seconds": 2.0,                # How often alerts written by other processes are picked up
+    "consistency_check_interval_seconds": 60.0   # How often the index is compared with the database
+}
+
+# Push delivery of new alerts to WebSocket subscribers (/alerts/subscribe)
+ALERT_SUBSCRIPTIONS = {
+    "cell_degrees": 0.1,       # Grid cell size for matching alerts to subscribers (about 11 km of latitude)
+    "max_radius_km": 50.0,     # Largest radius a subscriber may ask for
+    "queue_size": 100          # Messages buffered per subscriber before new alerts are dropped
+}
+
+# Short-lived cache of /alerts/nearby database results, shared by callers in the same grid cell
+NEARBY_CACHE = {
+    "enabled": os.getenv("NEARBY_CACHE_ENABLED", "1") == "1",
+    "ttl_seconds": 5.0,                               # Also sent as Cache-Control max-age
+    "max_entries": 5000,                              # Cached (cell, radius bucket, filter) combinations
+    "cell_degrees": 0.01,                             # Grid cell size (about 1.1 km of latitude)
+    "radius_buckets_km": [0.5, 1, 2, 5, 10, 25, 50]   # Radii are rounded up to these; larger ones aren't cached
+}
+
+# In-process catalog of notifiable classes (reloaded when changed through this process)
+CLASS_CATALOG = {
+    "refresh_seconds": 300.0   # Changes made through other worker processes show up after this long
+}
+
+# Merging of reports of the same sound into one alert. Worker processes take turns per class
+# (MySQL named lock), and each device counts once per alert (alert_reporters table).
+ALERT_DEDUP = {
+    "enabled": True,
+    "radius_km": 0.5,          # Reports closer than this to an alert's centroid are merged into it
+    "window_seconds": 120,     # ... if the alert was last reported within this many seconds
+    "lock_timeout_seconds": 5  # Wait for another process ingesting the same class at most this long
+}
+
+# Alert expiry and archiving (background reaper that keeps the alerts table small)
+ALERT_RETENTION = {
+    "default_ttl_hours": 1,             # Lifetime of new alerts, also used for old alerts without expires_at
+    "reap_interval_seconds": 60.0,      # How often expired alerts are moved to alerts_archive
+    "batch_size": 1000,                 # Alerts moved per transaction
+    "archive_retention_days": int(os.getenv("ALERT_ARCHIVE_RETENTION_DAYS", "30"))  # 0 keeps archived alerts forever
+}
+
+# Looking up the users to notify around an alert
+RECIPIENT_INDEX = {
+    "cell_degrees": 0.05,     # Grid cell size of user_locations.grid_cell; changing it requires recomputing the column
+    "radius_km": 5.0,         # Default notification radius around an alert
+    "active_minutes": 30      # Only users whose location was updated this recently are notified
+}
+
+# Buffered user location writes (POST /alerts/location and /alerts/subscribe)
+LOCATION_BUFFER = {
+    "flush_interval_seconds": 5.0,        # How often buffered locations are upserted
+    "batch_size": 1000,                   # Locations per multi-row upsert
+    "min_move_meters": 10.0,              # Moves shorter than this (or the reported accuracy) aren't written
+    "max_write_interval_seconds": 300.0,  # ... unless the stored location is older than this
+    "retain_seconds": 3600.0              # Forget in-memory positions not updated for this long
+}
+
+# Read routing settings. The time of a client's last write is returned in a cookie and the
+# X-Last-Write header; clients without a cookie jar send the header back to read their own writes.
+READ_ROUTING = {
+    "sticky_seconds": float(os.getenv("DB_READ_STICKY_SECONDS", "5"))  # Reads go to the primary this long after a client writes
+}
+
+# Connection pool settings (applied to both the sync and the async engine)
+DB_POOL = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),        # Connections kept open per engine
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),  # Extra connections allowed under load
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),  # Seconds to wait for a free connection
+    "pool_recycle": 1800,                                      # Reconnect before MySQL's wait_timeout
+    "pool_pre_ping": True                                      # Detect stale connections before use
+}
+
 # Authentication settings
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_hex(32))  # Generate random key if not provided
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Password hashing settings (bcrypt runs in a bounded thread pool, off the event loop)
+PASSWORD_HASHING = {
+    "bcrypt_rounds": int(os.getenv("BCRYPT_ROUNDS", "12")),  # bcrypt cost factor for new hashes
+    "max_workers": min(4, os.cpu_count() or 1),              # Hashes computed concurrently
+    "max_pending": 64,                                       # Queued + running operations before rejecting
+    "rehash_on_login": True                                  # Upgrade hashes made with other cost settings on login
+}
+
+# Authenticated user cache (bounds how long other workers may see stale user records)
+USER_CACHE = {
+    "max_entries": 10000,   # Maximum number of cached users
+    "ttl_seconds": 60       # Changes made on another worker take effect within this time
+}
+
 # User privilege levels
 class UserPrivilege:
     USER = "user"
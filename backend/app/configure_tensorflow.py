@@ -6,8 +6,14 @@ from app.config import MODEL_OPTIMIZATION
 
 logger = logging.getLogger("sound-api")
 
-# Configure TensorFlow on import
+_configured = False
+
 def configure_tensorflow():
+    """Apply MODEL_OPTIMIZATION to TensorFlow, once per process"""
+    global _configured
+    if _configured:
+        return True
+    _configured = True
     try:
         # Ensure GPU is visible
         physical_devices = tf.config.list_physical_devices('GPU')
@@ -75,5 +81,3 @@ def configure_tensorflow():
         logger.error(f"Error configuring TensorFlow: {e}")
         return False
 
-# Automatically configure when module is imported
-configure_tensorflow()
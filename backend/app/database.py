@@ -1,32 +1,59 @@
 import os
+import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text, func
-from sqlalchemy.orm import sessionmaker, Session
-from typing import List, Optional, Dict, Any
-from passlib.context import CryptContext
+from sqlalchemy import create_engine, text, func, insert, update, delete, case, select, literal, or_, DateTime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker, selectinload, Session
+from typing import List, Optional, Dict, Any, Tuple
 from math import radians, cos, sin, asin, sqrt
+import numpy as np
 
-from app.config import DATABASE_URL, UserPrivilege
+from fastapi import Request
+
+from app.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, READ_DATABASE_URL, ASYNC_READ_DATABASE_URL, DB_POOL, UserPrivilege,
+    ALERT_RADIUS_STRATEGY, ALERT_SPATIAL_INDEX, ALERT_RETENTION, RECIPIENT_INDEX
+)
+from app.geo import bounding_box, envelope, distance_km, nearest_within_radius, grid_cell, grid_cell_ranges
+from app.migrations import apply_migrations
+from app.password_hashing import pwd_context
+from app.read_routing import read_router
+from app.user_cache import user_cache
 from app.models import (
-    Base, User, Evaluation, Prediction, NotifiableClass, UserLocation, Alert
+    Base, User, Evaluation, EvaluationClassStats, Prediction, NotifiableClass, UserLocation, Alert, AlertReporter,
+    AlertArchive
 )
 
 # Setup logging
 logger = logging.getLogger("sound-api")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Create SQLAlchemy engine (sync path, used by scripts, training and non-critical routes)
+engine = create_engine(DATABASE_URL, **DB_POOL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Create async SQLAlchemy engine (used by the hot request paths so queries don't block the event loop)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **DB_POOL)
+AsyncSessionLocal = sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Optional read replica engines (fall back to the primary when no replica is configured)
+read_engine = create_engine(READ_DATABASE_URL, **DB_POOL) if READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if READ_DATABASE_URL else SessionLocal
+async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, **DB_POOL) if ASYNC_READ_DATABASE_URL else async_engine
+AsyncReadSessionLocal = sessionmaker(
+    bind=async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+) if ASYNC_READ_DATABASE_URL else AsyncSessionLocal
 
 # Database initialization
 def init_database():
     """Initialize the database and create tables"""
     try:
         Base.metadata.create_all(bind=engine)
+        
+        # Bring existing databases up to date (indexes and other changes create_all can't apply)
+        apply_migrations(engine)
         logger.info("Database schema initialized successfully")
         
         # Create default admin user if no users exist
@@ -35,6 +62,10 @@ def init_database():
             user_count = db.query(User).count()
             if user_count == 0:
                 create_default_admin(db)
+            
+            # Fill the evaluation rollup for databases that predate it
+            if db.query(EvaluationClassStats).first() is None and db.query(Evaluation.id).first() is not None:
+                rebuild_evaluation_stats(db)
             db.close()
         except Exception as e:
             db.close()
@@ -70,6 +101,28 @@ def get_db_session():
     finally:
         db.close()
 
+# Async database session dependency
+async def get_async_db_session():
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Read-only session dependencies, routed to the replica unless the client wrote recently
+def get_read_db_session(request: Request):
+    """Get database session for read-only queries"""
+    session_factory = ReadSessionLocal if read_router.use_replica(request) else SessionLocal
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db_session(request: Request):
+    """Get async database session for read-only queries"""
+    session_factory = AsyncReadSessionLocal if read_router.use_replica(request) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
 # Database context helper for non-dependency contexts
 def get_db():
     """Get database session as a regular function (not a generator)"""
@@ -81,13 +134,18 @@ def get_db():
         raise e
 
 # User operations
-def create_user(db: Session, username: str, email: str, password: str, privilege: str = UserPrivilege.USER) -> Optional[User]:
-    """Create a new user"""
+def create_user(db: Session, username: str, email: str, password: Optional[str], privilege: str = UserPrivilege.USER,
+               hashed_password: Optional[str] = None) -> Optional[User]:
+    """
+    Create a new user
+    
+    Pass hashed_password to store a hash computed elsewhere (e.g. off the event loop)
+    """
     try:
         user = User(
             username=username,
             email=email,
-            hashed_password=pwd_context.hash(password),
+            hashed_password=hashed_password or pwd_context.hash(password),
             privilege=privilege
         )
         db.add(user)
@@ -100,8 +158,13 @@ def create_user(db: Session, username: str, email: str, password: str, privilege
         return None
 
 def update_user(db: Session, user_id: int, username: Optional[str] = None, 
-               email: Optional[str] = None, password: Optional[str] = None) -> Optional[User]:
-    """Update a user's information"""
+               email: Optional[str] = None, password: Optional[str] = None,
+               hashed_password: Optional[str] = None) -> Optional[User]:
+    """
+    Update a user's information
+    
+    Pass hashed_password instead of password to store a hash computed elsewhere
+    """
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
@@ -124,11 +187,14 @@ def update_user(db: Session, user_id: int, username: Optional[str] = None,
             user.email = email
             
         # Update password if provided
-        if password is not None:
+        if hashed_password is not None:
+            user.hashed_password = hashed_password
+        elif password is not None:
             user.hashed_password = pwd_context.hash(password)
             
         db.commit()
         db.refresh(user)
+        user_cache.invalidate(user_id=user_id)
         logger.info(f"Updated user: {user.username}")
         return user
     except ValueError as ve:
@@ -150,6 +216,7 @@ def delete_user(db: Session, user_id: int) -> bool:
         # You might want to handle cascading deletes depending on your model relationships
         db.delete(user)
         db.commit()
+        user_cache.invalidate(user_id=user_id, username=user.username)
         logger.info(f"Deleted user: {user.username}")
         return True
     except Exception as e:
@@ -157,10 +224,47 @@ def delete_user(db: Session, user_id: int) -> bool:
         logger.error(f"Failed to delete user: {str(e)}")
         return False
 
+def set_user_privilege(db: Session, user_id: int, privilege: str) -> Optional[User]:
+    """Change a user's privilege level"""
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return None
+        
+        user.privilege = privilege
+        db.commit()
+        db.refresh(user)
+        user_cache.invalidate(user_id=user_id, username=user.username)
+        logger.info(f"Set privilege of user {user.username} to {privilege}")
+        return user
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to set user privilege: {str(e)}")
+        return None
+
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Get user by username"""
     return db.query(User).filter(User.username == username).first()
 
+def get_users_page(db: Session, limit: int = 100, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get a page of users ordered by ID, as plain dictionaries without password hashes
+    
+    Pass the id of the last user of the previous page as after_id to get the next page
+    """
+    query = select(
+        User.id,
+        User.username,
+        User.email,
+        User.privilege,
+        User.created_at
+    ).order_by(User.id).limit(limit)
+    
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    
+    return [dict(row) for row in db.execute(query).mappings()]
+
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email"""
     return db.query(User).filter(User.email == email).first()
@@ -180,7 +284,7 @@ def get_password_hash(password: str) -> str:
 # Evaluation operations
 def add_evaluation(db: Session, user_id: Optional[int], device_id: str, recording_date: datetime, 
                   recording_name: str, detection_class: str, detection_confidence: float, success: bool) -> Optional[Evaluation]:
-    """Add a user evaluation to the database"""
+    """Add a user evaluation to the database and update the per-class rollup"""
     try:
         evaluation = Evaluation(
             user_id=user_id,
@@ -192,6 +296,12 @@ def add_evaluation(db: Session, user_id: Optional[int], device_id: str, recordin
             success=success
         )
         db.add(evaluation)
+        _update_evaluation_rollup(db, [{
+            "detection_class": detection_class,
+            "total": 1,
+            "successful": 1 if success else 0,
+            "confidence_sum": detection_confidence
+        }])
         db.commit()
         db.refresh(evaluation)
         logger.info(f"Added evaluation for {recording_name} with success={success}")
@@ -201,60 +311,125 @@ def add_evaluation(db: Session, user_id: Optional[int], device_id: str, recordin
         logger.error(f"Failed to add evaluation: {str(e)}")
         return None
 
-def get_evaluation_stats(db: Session) -> Optional[Dict[str, Any]]:
-    """Get statistics about evaluations"""
+def add_evaluations_bulk(db: Session, evaluations: List[Dict[str, Any]]) -> int:
+    """
+    Add several evaluations with a single multi-row INSERT and update the rollup
+    
+    Each dictionary holds the Evaluation column values. Returns the number of
+    rows written (0 on failure).
+    """
+    if not evaluations:
+        return 0
     try:
-        # Get total evaluations count
-        total_evaluations = db.query(func.count(Evaluation.id)).scalar() or 0
+        now = datetime.utcnow()
+        rows = [dict(evaluation, created_at=evaluation.get("created_at", now)) for evaluation in evaluations]
+        db.execute(insert(Evaluation).values(rows))
         
-        # Get successful evaluations count
-        successful_evaluations = db.query(func.count(Evaluation.id)).filter(Evaluation.success == True).scalar() or 0
+        # Fold the batch into one rollup increment per class
+        increments = {}
+        for row in rows:
+            increment = increments.setdefault(row["detection_class"], {
+                "detection_class": row["detection_class"],
+                "total": 0,
+                "successful": 0,
+                "confidence_sum": 0.0
+            })
+            increment["total"] += 1
+            increment["successful"] += 1 if row["success"] else 0
+            increment["confidence_sum"] += row["detection_confidence"]
+        _update_evaluation_rollup(db, list(increments.values()))
+        
+        db.commit()
+        logger.info(f"Added {len(rows)} evaluations in bulk")
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to add {len(evaluations)} evaluations: {str(e)}")
+        return 0
+
+def _update_evaluation_rollup(db: Session, increments: List[Dict[str, Any]]) -> None:
+    """Add per-class increments to the evaluation rollup (does not commit)"""
+    stmt = mysql_insert(EvaluationClassStats).values(increments)
+    stmt = stmt.on_duplicate_key_update(
+        total=EvaluationClassStats.total + stmt.inserted.total,
+        successful=EvaluationClassStats.successful + stmt.inserted.successful,
+        confidence_sum=EvaluationClassStats.confidence_sum + stmt.inserted.confidence_sum,
+        updated_at=datetime.utcnow()
+    )
+    db.execute(stmt)
+
+def evaluation_aggregate_query():
+    """Build the grouped query with per-class totals, using conditional aggregation for successes"""
+    return select(
+        Evaluation.detection_class.label("detection_class"),
+        func.count(Evaluation.id).label("total"),
+        func.sum(case((Evaluation.success == True, 1), else_=0)).label("successful"),
+        func.sum(Evaluation.detection_confidence).label("confidence_sum")
+    ).group_by(Evaluation.detection_class)
+
+def aggregate_evaluations_by_class(db: Session) -> List[Dict[str, Any]]:
+    """Compute per-class evaluation totals with a single grouped query"""
+    rows = db.execute(evaluation_aggregate_query()).all()
+    
+    return [
+        {
+            "detection_class": row.detection_class,
+            "total": int(row.total or 0),
+            "successful": int(row.successful or 0),
+            "confidence_sum": float(row.confidence_sum or 0.0)
+        }
+        for row in rows
+    ]
+
+def rebuild_evaluation_stats(db: Session) -> bool:
+    """Recompute the evaluation rollup table from the evaluations table"""
+    try:
+        totals = aggregate_evaluations_by_class(db)
+        db.query(EvaluationClassStats).delete(synchronize_session=False)
+        if totals:
+            db.execute(insert(EvaluationClassStats).values(totals))
+        db.commit()
+        logger.info(f"Rebuilt evaluation statistics for {len(totals)} classes")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to rebuild evaluation stats: {str(e)}")
+        return False
+
+def get_evaluation_stats(db: Session) -> Optional[Dict[str, Any]]:
+    """Get statistics about evaluations from the per-class rollup"""
+    try:
+        rows = db.query(
+            EvaluationClassStats.detection_class,
+            EvaluationClassStats.total,
+            EvaluationClassStats.successful,
+            EvaluationClassStats.confidence_sum
+        ).filter(EvaluationClassStats.total > 0).all()
         
-        # Get unsuccessful evaluations count
-        unsuccessful_evaluations = db.query(func.count(Evaluation.id)).filter(Evaluation.success == False).scalar() or 0
+        total_evaluations = sum(row.total for row in rows)
+        successful_evaluations = sum(row.successful for row in rows)
+        confidence_sum = sum(row.confidence_sum for row in rows)
         
-        # Calculate success rate
+        # Calculate success rate and average confidence
         overall_success_rate = successful_evaluations / total_evaluations if total_evaluations > 0 else 0
-        
-        # Get average confidence
-        avg_confidence = db.query(func.avg(Evaluation.detection_confidence)).scalar() or 0.0
+        avg_confidence = confidence_sum / total_evaluations if total_evaluations > 0 else 0.0
         
         # Get distribution by class
-        class_distribution_query = db.query(
-            Evaluation.detection_class.label("class_name"),
-            func.count(Evaluation.id).label("count")
-        ).group_by(Evaluation.detection_class).order_by(func.count(Evaluation.id).desc())
-        
-        class_distribution = []
-        for row in class_distribution_query:
-            class_distribution.append({
-                "class_name": row.class_name,
-                "count": row.count
-            })
+        class_distribution = [
+            {"class_name": row.detection_class, "count": row.total}
+            for row in sorted(rows, key=lambda r: r.total, reverse=True)
+        ]
         
         # Get success rate by class
-        class_success_rates = []
-        for class_item in class_distribution:
-            class_name = class_item["class_name"]
-            
-            # Get total count for this class
-            total_for_class = class_item["count"]
-            
-            # Get successful count for this class
-            successful_for_class = db.query(func.count(Evaluation.id))\
-                .filter(Evaluation.detection_class == class_name)\
-                .filter(Evaluation.success == True)\
-                .scalar() or 0
-            
-            # Calculate success rate
-            success_rate = successful_for_class / total_for_class if total_for_class > 0 else 0
-            
-            class_success_rates.append({
-                "class_name": class_name,
-                "success_rate": success_rate,
-                "total": total_for_class,
-                "successful": successful_for_class
-            })
+        class_success_rates = [
+            {
+                "class_name": row.detection_class,
+                "success_rate": row.successful / row.total,
+                "total": row.total,
+                "successful": row.successful
+            }
+            for row in rows
+        ]
         
         # Sort by success rate descending
         class_success_rates.sort(key=lambda x: x["success_rate"], reverse=True)
@@ -273,9 +448,12 @@ def get_evaluation_stats(db: Session) -> Optional[Dict[str, Any]]:
 # Prediction operations
 def add_prediction(db: Session, user_id: Optional[int], file_name: str, file_path: str, 
                   highest_class: str, highest_confidence: float, all_predictions: Dict) -> Optional[Prediction]:
-    """Add a prediction to the database and maintain only the last 100 predictions"""
+    """
+    Add a single prediction to the database
+    
+    Old predictions are not pruned here; see prune_predictions
+    """
     try:
-        # Convert predictions dict to JSON string if needed
         prediction = Prediction(
             user_id=user_id,
             file_name=file_name,
@@ -285,11 +463,6 @@ def add_prediction(db: Session, user_id: Optional[int], file_name: str, file_pat
             all_predictions=all_predictions
         )
         db.add(prediction)
-        
-        # Delete older predictions to keep only the latest 100
-        subquery = db.query(Prediction.id).order_by(Prediction.created_at.desc()).limit(100).subquery()
-        db.query(Prediction).filter(~Prediction.id.in_(subquery)).delete(synchronize_session=False)
-        
         db.commit()
         db.refresh(prediction)
         logger.info(f"Added prediction for {file_name}")
@@ -299,76 +472,94 @@ def add_prediction(db: Session, user_id: Optional[int], file_name: str, file_pat
         logger.error(f"Failed to add prediction: {str(e)}")
         return None
 
-def get_latest_predictions(db: Session, limit: int = 100) -> List[Dict[str, Any]]:
-    """Get the latest predictions from the database"""
+def add_predictions_bulk(db: Session, predictions: List[Dict[str, Any]]) -> int:
+    """
+    Add several predictions with a single multi-row INSERT
+    
+    Returns the number of rows written (0 on failure)
+    """
+    if not predictions:
+        return 0
     try:
-        # Query only the columns we know exist
-        predictions = db.query(Prediction).order_by(Prediction.created_at.desc()).limit(limit).all()
+        db.execute(insert(Prediction).values(predictions))
+        db.commit()
+        return len(predictions)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to add {len(predictions)} predictions: {str(e)}")
+        return 0
+
+def prune_predictions(db: Session, keep: int = 100) -> int:
+    """
+    Delete all but the latest `keep` predictions, returns the number of deleted rows
+
+    A `keep` of 0 or less disables pruning.
+    """
+    if keep < 1:
+        return 0
+    try:
+        # MySQL can't use LIMIT in a subquery of a DELETE on the same table,
+        # so look up the oldest timestamp to keep first
+        cutoff = db.query(Prediction.created_at)\
+            .order_by(Prediction.created_at.desc())\
+            .offset(keep - 1)\
+            .limit(1)\
+            .scalar()
+        if cutoff is None:
+            return 0
+        
+        deleted = db.query(Prediction).filter(Prediction.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to prune predictions: {str(e)}")
+        return 0
+
+def latest_predictions_query(limit: int = 100, after_id: Optional[int] = None):
+    """Build the keyset-paginated query for a page of predictions, newest first"""
+    # Select plain columns to skip ORM object hydration
+    query = select(
+        Prediction.id,
+        Prediction.user_id,
+        Prediction.file_name,
+        Prediction.file_path,
+        Prediction.highest_class,
+        Prediction.highest_confidence,
+        Prediction.all_predictions,
+        Prediction.created_at
+    ).order_by(Prediction.id.desc()).limit(limit)
+    
+    if after_id is not None:
+        query = query.where(Prediction.id < after_id)
+    return query
+
+def get_latest_predictions(db: Session, limit: int = 100, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get a page of the latest predictions, newest first
+    
+    Pass the id of the last prediction of the previous page as after_id to get the next page
+    """
+    try:
+        query = latest_predictions_query(limit, after_id)
         
-        # Convert SQLAlchemy objects to dictionaries
         result = []
-        for pred in predictions:
-            pred_dict = {
-                "id": pred.id,
-                "file_name": pred.file_name,
-                "file_path": pred.file_path,
-                "highest_class": pred.highest_class,
-                "highest_confidence": pred.highest_confidence,
-                "created_at": pred.created_at
-            }
-            # Only add user_id if it exists on the model
-            if hasattr(pred, 'user_id'):
-                pred_dict["user_id"] = pred.user_id
+        for row in db.execute(query).mappings():
+            pred_dict = dict(row)
             
             # Handle all_predictions specially - make sure it's a dict
-            if hasattr(pred, 'all_predictions'):
-                if isinstance(pred.all_predictions, dict):
-                    pred_dict["all_predictions"] = pred.all_predictions
-                else:
-                    # Try to convert from JSON string if needed
-                    try:
-                        import json
-                        pred_dict["all_predictions"] = json.loads(pred.all_predictions)
-                    except:
-                        pred_dict["all_predictions"] = {}
+            if not isinstance(pred_dict["all_predictions"], dict):
+                try:
+                    pred_dict["all_predictions"] = json.loads(pred_dict["all_predictions"])
+                except Exception:
+                    pred_dict["all_predictions"] = {}
             
             result.append(pred_dict)
         
         return result
     except Exception as e:
         logger.error(f"Failed to get latest predictions: {str(e)}")
-        
-        # Fallback query if there's a schema mismatch
-        try:
-            # Try a more selective query that excludes potentially problematic columns
-            rows = db.query(
-                Prediction.id,
-                Prediction.file_name,
-                Prediction.file_path,
-                Prediction.highest_class,
-                Prediction.highest_confidence,
-                Prediction.created_at
-            ).order_by(Prediction.created_at.desc()).limit(limit).all()
-            
-            # Convert the results to dictionaries
-            result = []
-            for row in rows:
-                # Create a dictionary from the row
-                pred_dict = {
-                    "id": row.id,
-                    "file_name": row.file_name, 
-                    "file_path": row.file_path,
-                    "highest_class": row.highest_class,
-                    "highest_confidence": row.highest_confidence,
-                    "created_at": row.created_at
-                }
-                result.append(pred_dict)
-            
-            logger.info("Successfully retrieved predictions with selective query")
-            return result
-        except Exception as fallback_error:
-            logger.error(f"Fallback prediction query also failed: {str(fallback_error)}")
-            return []
+        return []
 
 # Notifiable class operations
 def create_notifiable_class(db: Session, class_name: str, description: Optional[str], 
@@ -403,6 +594,22 @@ def get_active_notifiable_classes(db: Session) -> List[NotifiableClass]:
     """Get all active notifiable classes"""
     return db.query(NotifiableClass).filter(NotifiableClass.is_active == True).all()
 
+def list_notifiable_classes(db: Session, include_inactive: bool = False) -> List[Dict[str, Any]]:
+    """Get notifiable classes as plain dictionaries, without loading ORM objects"""
+    query = select(
+        NotifiableClass.id,
+        NotifiableClass.class_name,
+        NotifiableClass.description,
+        NotifiableClass.min_confidence,
+        NotifiableClass.is_active,
+        NotifiableClass.created_at
+    ).order_by(NotifiableClass.id)
+    
+    if not include_inactive:
+        query = query.where(NotifiableClass.is_active == True)
+    
+    return [dict(row) for row in db.execute(query).mappings()]
+
 def update_notifiable_class(db: Session, class_id: int, min_confidence: Optional[float] = None,
                           description: Optional[str] = None, is_active: Optional[bool] = None) -> Optional[NotifiableClass]:
     """Update a notifiable class"""
@@ -463,11 +670,81 @@ def get_user_location(db: Session, user_id: int) -> Optional[UserLocation]:
     """Get a user's last known location"""
     return db.query(UserLocation).filter(UserLocation.user_id == user_id).first()
 
+def upsert_user_locations(db: Session, locations: List[Dict[str, Any]]) -> int:
+    """
+    Insert or update several users' locations with a single multi-row upsert
+
+    Each dict holds user_id, latitude, longitude, accuracy and last_updated.
+    A row is only overwritten by a newer position, so batches flushed by
+    different worker processes can arrive in any order. Returns the number
+    of locations written (0 on failure).
+    """
+    if not locations:
+        return 0
+    try:
+        # Core inserts bypass the ORM events that fill grid_cell
+        rows = [
+            dict(location, grid_cell=grid_cell(location["latitude"], location["longitude"], RECIPIENT_INDEX["cell_degrees"]))
+            for location in locations
+        ]
+        stmt = mysql_insert(UserLocation).values(rows)
+        is_newer = stmt.inserted.last_updated >= UserLocation.last_updated
+        # MySQL assigns in order, so last_updated has to come after the columns comparing against it
+        stmt = stmt.on_duplicate_key_update([
+            ("latitude", case((is_newer, stmt.inserted.latitude), else_=UserLocation.latitude)),
+            ("longitude", case((is_newer, stmt.inserted.longitude), else_=UserLocation.longitude)),
+            ("accuracy", case((is_newer, stmt.inserted.accuracy), else_=UserLocation.accuracy)),
+            ("grid_cell", case((is_newer, stmt.inserted.grid_cell), else_=UserLocation.grid_cell)),
+            ("last_updated", func.greatest(UserLocation.last_updated, stmt.inserted.last_updated))
+        ])
+        db.execute(stmt)
+        db.commit()
+        return len(locations)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to upsert {len(locations)} user locations: {str(e)}")
+        return 0
+
+def recipients_query(latitude: float, longitude: float, radius_km: float, active_after: datetime):
+    """
+    Build the query for the locations of users in the grid cells around a point, updated after a time
+
+    Each grid row is one contiguous range of cell numbers, so the lookup is a
+    handful of range scans on ix_user_locations_cell_updated.
+    """
+    cell_ranges = grid_cell_ranges(*bounding_box(latitude, longitude, radius_km), RECIPIENT_INDEX["cell_degrees"])
+    return select(UserLocation.user_id, UserLocation.latitude, UserLocation.longitude).where(
+        or_(*[UserLocation.grid_cell.between(first, last) for first, last in cell_ranges]),
+        UserLocation.last_updated >= active_after
+    )
+
+def _recipients_within_radius(rows, latitude: float, longitude: float, radius_km: float,
+                              exclude_user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Filter candidate (user_id, latitude, longitude) rows to the radius, nearest first"""
+    rows = [row for row in rows if row[0] != exclude_user_id]
+    if not rows:
+        return []
+    coordinates = np.array([(row[1], row[2]) for row in rows], dtype=np.float64)
+    order, distances = nearest_within_radius(latitude, longitude, coordinates[:, 0], coordinates[:, 1], radius_km)
+    return [{"user_id": rows[i][0], "distance_km": float(distances[i])} for i in order]
+
+def get_alert_recipients(db: Session, latitude: float, longitude: float, radius_km: float,
+                         active_after: datetime, exclude_user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get the users whose location, updated after active_after, is within a radius of a point, nearest first"""
+    try:
+        rows = db.execute(recipients_query(latitude, longitude, radius_km, active_after)).all()
+        return _recipients_within_radius(rows, latitude, longitude, radius_km, exclude_user_id)
+    except Exception as e:
+        logger.error(f"Failed to get alert recipients: {str(e)}")
+        return []
+
 # Alert operations
 def create_alert(db: Session, user_id: Optional[int], class_id: int, latitude: float, longitude: float,
                 confidence: float, device_id: str, expires_at: Optional[datetime] = None) -> Optional[Alert]:
-    """Create a new alert"""
+    """Create a new alert, expiring after the default lifetime unless expires_at is given"""
     try:
+        if expires_at is None:
+            expires_at = datetime.utcnow() + timedelta(hours=ALERT_RETENTION["default_ttl_hours"])
         alert = Alert(
             user_id=user_id,
             class_id=class_id,
@@ -504,57 +781,213 @@ def verify_alert(db: Session, alert_id: int) -> Optional[Alert]:
         logger.error(f"Failed to verify alert: {str(e)}")
         return None
 
-def get_alerts_in_radius(db: Session, latitude: float, longitude: float, radius_km: float, 
-                        class_ids: Optional[List[int]] = None, hours_ago: Optional[int] = None) -> List[Alert]:
+# Columns copied from alerts to alerts_archive
+ARCHIVED_ALERT_COLUMNS = (
+    "id", "user_id", "class_id", "latitude", "longitude", "confidence",
+    "device_id", "is_verified", "reporter_count", "created_at", "last_reported_at", "expires_at"
+)
+
+def archive_expired_alerts(db: Session, batch_size: int = 1000) -> int:
     """
-    Get alerts within a radius of a point
+    Move up to batch_size expired alerts to alerts_archive in one transaction
     
-    Uses the Haversine formula to calculate distance between coordinates
+    Returns the number of archived alerts
     """
     try:
-        # Convert radius from km to degrees (approximate)
-        # 1 degree of latitude is approximately 111 km (varying slightly with latitude)
-        radius_deg = radius_km / 111.0
-        
-        # Build the base query
-        query = db.query(Alert)
-        
-        # Apply time filter if specified
-        if hours_ago is not None:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours_ago)
-            query = query.filter(Alert.created_at >= cutoff_time)
+        now = datetime.utcnow()
+        alert_ids = db.execute(
+            select(Alert.id)
+            .where(Alert.expires_at <= now)
+            .order_by(Alert.expires_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not alert_ids:
+            return 0
         
-        # Apply class filter if specified
-        if class_ids:
-            query = query.filter(Alert.class_id.in_(class_ids))
-        
-        # Apply radius filter using approximate bounding box for efficiency
-        query = query.filter(
-            Alert.latitude >= latitude - radius_deg,
-            Alert.latitude <= latitude + radius_deg,
-            Alert.longitude >= longitude - radius_deg,
-            Alert.longitude <= longitude + radius_deg
+        source_columns = [getattr(Alert, name) for name in ARCHIVED_ALERT_COLUMNS]
+        db.execute(
+            insert(AlertArchive).from_select(
+                list(ARCHIVED_ALERT_COLUMNS) + ["archived_at"],
+                select(*source_columns, literal(now, DateTime)).where(Alert.id.in_(alert_ids))
+            ).prefix_with("IGNORE")
         )
+        db.execute(delete(AlertReporter).where(AlertReporter.alert_id.in_(alert_ids)))
+        db.execute(delete(Alert).where(Alert.id.in_(alert_ids)))
+        db.commit()
+        return len(alert_ids)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to archive expired alerts: {str(e)}")
+        return 0
+
+def purge_archived_alerts(db: Session, retention_days: int, batch_size: int = 1000) -> int:
+    """Delete up to batch_size archived alerts created more than retention_days ago"""
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        alert_ids = db.execute(
+            select(AlertArchive.id)
+            .where(AlertArchive.created_at < cutoff)
+            .limit(batch_size)
+        ).scalars().all()
+        if not alert_ids:
+            return 0
         
-        # Get potential matches
-        potential_matches = query.all()
-        
-        # Filter more precisely using Haversine formula
-        results = []
-        for alert in potential_matches:
-            distance = calculate_distance(latitude, longitude, alert.latitude, alert.longitude)
-            if distance <= radius_km:
-                # Add distance information to the alert object
-                setattr(alert, 'distance_km', distance)
-                results.append(alert)
-        
-        # Sort by distance
-        results.sort(key=lambda x: getattr(x, 'distance_km'))
-        return results
+        db.execute(delete(AlertArchive).where(AlertArchive.id.in_(alert_ids)))
+        db.commit()
+        return len(alert_ids)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to purge archived alerts: {str(e)}")
+        return 0
+
+def get_alerts_in_radius(db: Session, latitude: float, longitude: float, radius_km: float, 
+                        class_ids: Optional[List[int]] = None, hours_ago: Optional[int] = None,
+                        include_expired: bool = False) -> List[Dict[str, Any]]:
+    """
+    Get alerts within a radius of a point, sorted by distance
+    
+    Distances are great circle distances, computed with a vectorized Haversine
+    formula or by MySQL depending on ALERT_RADIUS_STRATEGY. Alerts are returned
+    as dictionaries with their notifiable class and distance_km set.
+    """
+    try:
+        query = alerts_in_radius_query(latitude, longitude, radius_km, class_ids, hours_ago, include_expired)
+        alerts = _alerts_within_radius(db.execute(query).mappings().all(), latitude, longitude, radius_km)
+        if alerts:
+            classes = db.execute(notifiable_classes_query(alerts)).scalars().all()
+            _attach_alert_classes(alerts, classes)
+        return alerts
     except Exception as e:
         logger.error(f"Failed to get alerts in radius: {str(e)}")
         return []
 
+# Columns needed for alert responses; candidates are fetched without building ORM objects
+ALERT_RESPONSE_COLUMNS = (
+    Alert.id, Alert.class_id, Alert.latitude, Alert.longitude, Alert.confidence,
+    Alert.device_id, Alert.is_verified, Alert.reporter_count, Alert.created_at
+)
+
+def alerts_in_radius_query(latitude: float, longitude: float, radius_km: float,
+                            class_ids: Optional[List[int]] = None, hours_ago: Optional[int] = None,
+                            include_expired: bool = False, strategy: str = ALERT_RADIUS_STRATEGY):
+    """
+    Build the query for alerts around a point
+    
+    With the "spatial" strategy the query uses the SPATIAL index on location and
+    returns rows with a distance_km column, already filtered and sorted by distance.
+    Otherwise it returns the rows in a bounding box on latitude/longitude, to be
+    checked with _alerts_within_radius. Expired alerts are left out unless
+    include_expired is set; alerts already archived are never included.
+    
+    The spatial strategy is only available when ALERT_RADIUS_STRATEGY is
+    "spatial", since alerts.location doesn't exist otherwise.
+    """
+    if strategy == "spatial" and not ALERT_SPATIAL_INDEX:
+        raise ValueError("The spatial strategy needs ALERT_RADIUS_STRATEGY=spatial")
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    
+    # Build the base query
+    if strategy == "spatial":
+        distance = distance_km(Alert.location, latitude, longitude)
+        query = (
+            select(*ALERT_RESPONSE_COLUMNS, distance.label("distance_km"))
+            .where(func.MBRContains(envelope(min_lat, max_lat, min_lon, max_lon), Alert.location))
+            .where(distance <= radius_km)
+            .order_by(distance)
+        )
+    else:
+        query = select(*ALERT_RESPONSE_COLUMNS).where(
+            Alert.latitude >= min_lat,
+            Alert.latitude <= max_lat,
+            Alert.longitude >= min_lon,
+            Alert.longitude <= max_lon
+        )
+    
+    # Apply time filter if specified
+    if hours_ago is not None:
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours_ago)
+        query = query.where(Alert.created_at >= cutoff_time)
+    
+    # Skip expired alerts the reaper hasn't archived yet
+    if not include_expired:
+        query = query.where((Alert.expires_at.is_(None)) | (Alert.expires_at > datetime.utcnow()))
+    
+    # Apply class filter if specified
+    if class_ids:
+        query = query.where(Alert.class_id.in_(class_ids))
+    
+    return query
+
+def _alerts_within_radius(rows, latitude: float, longitude: float, radius_km: float) -> List[Dict[str, Any]]:
+    """
+    Turn the rows of alerts_in_radius_query into alert dictionaries with distance_km, nearest first
+    
+    Bounding box candidates are filtered and sorted in one vectorized pass.
+    """
+    if not rows:
+        return []
+    if "distance_km" in rows[0]:
+        # Spatial strategy: already filtered and sorted by the database
+        return [dict(row) for row in rows]
+    
+    latitudes = np.fromiter((row["latitude"] for row in rows), dtype=np.float64, count=len(rows))
+    longitudes = np.fromiter((row["longitude"] for row in rows), dtype=np.float64, count=len(rows))
+    order, distances = nearest_within_radius(latitude, longitude, latitudes, longitudes, radius_km)
+    return [
+        dict(rows[index], distance_km=distance)
+        for index, distance in zip(order.tolist(), distances[order].tolist())
+    ]
+
+def notifiable_classes_query(alerts: List[Dict[str, Any]]):
+    """Build the query for the notifiable classes referenced by a list of alert dictionaries"""
+    class_ids = {alert["class_id"] for alert in alerts}
+    return select(NotifiableClass).where(NotifiableClass.id.in_(class_ids))
+
+def _attach_alert_classes(alerts: List[Dict[str, Any]], classes: List[NotifiableClass]) -> None:
+    """Set alert_class on each alert dictionary"""
+    classes_by_id = {notifiable_class.id: notifiable_class for notifiable_class in classes}
+    for alert in alerts:
+        alert["alert_class"] = classes_by_id.get(alert["class_id"])
+
+def get_live_alerts(db: Session, created_after: datetime, after_id: int = 0,
+                    reported_after: Optional[datetime] = None) -> List[Alert]:
+    """
+    Get alerts created after a time that have not expired, with their class loaded
+    
+    Only alerts with an ID greater than after_id, or (if given) merged with a
+    new report after reported_after, are returned, ordered by ID, so callers
+    can catch up incrementally.
+    """
+    try:
+        now = datetime.utcnow()
+        changed = Alert.id > after_id
+        if reported_after is not None:
+            changed = changed | (Alert.last_reported_at > reported_after)
+        query = (
+            select(Alert)
+            .options(selectinload(Alert.alert_class))
+            .where(Alert.created_at >= created_after, changed)
+            .where((Alert.expires_at.is_(None)) | (Alert.expires_at > now))
+            .order_by(Alert.id)
+        )
+        return db.execute(query).scalars().all()
+    except Exception as e:
+        logger.error(f"Failed to get live alerts: {str(e)}")
+        return []
+
+def count_live_alerts(db: Session, created_after: datetime) -> Optional[int]:
+    """Count alerts created after a time that have not expired"""
+    try:
+        now = datetime.utcnow()
+        return db.execute(
+            select(func.count(Alert.id))
+            .where(Alert.created_at >= created_after)
+            .where((Alert.expires_at.is_(None)) | (Alert.expires_at > now))
+        ).scalar()
+    except Exception as e:
+        logger.error(f"Failed to count live alerts: {str(e)}")
+        return None
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance between two points 
@@ -569,4 +1002,208 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a))
     r = 6371  # Radius of earth in kilometers
-    return c * r
\ No newline at end of file
+    return c * r
+
+# Async operations (hot request paths)
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[User]:
+    """Get user by username"""
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+async def update_password_hash_async(db: AsyncSession, user_id: int, hashed_password: str) -> bool:
+    """Store a new password hash for a user (used when rehashing on login)"""
+    try:
+        await db.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to update password hash: {str(e)}")
+        return False
+
+async def get_user_location_async(db: AsyncSession, user_id: int) -> Optional[UserLocation]:
+    """Get a user's last known location"""
+    result = await db.execute(select(UserLocation).where(UserLocation.user_id == user_id))
+    return result.scalars().first()
+
+async def get_alert_recipients_async(db: AsyncSession, latitude: float, longitude: float, radius_km: float,
+                                     active_after: datetime, exclude_user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get the users whose location, updated after active_after, is within a radius of a point, nearest first"""
+    try:
+        result = await db.execute(recipients_query(latitude, longitude, radius_km, active_after))
+        return _recipients_within_radius(result.all(), latitude, longitude, radius_km, exclude_user_id)
+    except Exception as e:
+        logger.error(f"Failed to get alert recipients: {str(e)}")
+        return []
+
+async def create_alert_async(db: AsyncSession, user_id: Optional[int], class_id: int, latitude: float, longitude: float,
+                            confidence: float, device_id: str, expires_at: Optional[datetime] = None) -> Optional[Alert]:
+    """Create a new alert, with its notifiable class loaded for the response"""
+    try:
+        if expires_at is None:
+            expires_at = datetime.utcnow() + timedelta(hours=ALERT_RETENTION["default_ttl_hours"])
+        alert = Alert(
+            user_id=user_id,
+            class_id=class_id,
+            latitude=latitude,
+            longitude=longitude,
+            confidence=confidence,
+            device_id=device_id,
+            expires_at=expires_at
+        )
+        db.add(alert)
+        await db.flush()
+        db.add(AlertReporter(alert_id=alert.id, device_id=device_id))
+        await db.commit()
+        
+        # Lazy loading is not available with async sessions, so load the class eagerly
+        result = await db.execute(
+            select(Alert)
+            .options(selectinload(Alert.alert_class))
+            .where(Alert.id == alert.id)
+            .execution_options(populate_existing=True)
+        )
+        alert = result.scalars().one()
+        logger.info(f"Created alert for class_id: {class_id}")
+        return alert
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to create alert: {str(e)}")
+        return None
+
+async def merge_alert_report_async(db: AsyncSession, alert_id: int, latitude: float, longitude: float,
+                                   confidence: float, device_id: str,
+                                   expires_at: datetime) -> Tuple[Optional[Alert], bool]:
+    """
+    Merge another report of the same sound into an existing alert
+    
+    The alert moves to the centroid of its reports, keeps the highest
+    confidence and has its expiry extended. This is a single UPDATE, so merges
+    running concurrently in other processes are not lost. The device is
+    recorded in alert_reporters in the same transaction; a device that
+    already reported the alert leaves it unchanged.
+    
+    Returns (alert, merged). alert is None if it no longer exists (e.g. it
+    was archived).
+    """
+    try:
+        # INSERT IGNORE adds no row for a repeated device (or an archived alert)
+        result = await db.execute(
+            insert(AlertReporter).prefix_with("IGNORE").values(alert_id=alert_id, device_id=device_id)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            return await get_alert_async(db, alert_id), False
+        
+        count = Alert.reporter_count
+        # MySQL applies SET assignments in order, so the centroid uses the old count
+        # and the location is computed from the new centroid
+        assignments = [
+            (Alert.latitude, (Alert.latitude * count + latitude) / (count + 1)),
+            (Alert.longitude, (Alert.longitude * count + longitude) / (count + 1))
+        ]
+        if ALERT_SPATIAL_INDEX:
+            assignments.append((Alert.location, func.Point(Alert.longitude, Alert.latitude)))
+        assignments += [
+            (Alert.confidence, func.greatest(Alert.confidence, confidence)),
+            (Alert.expires_at, func.greatest(func.coalesce(Alert.expires_at, expires_at), expires_at)),
+            (Alert.last_reported_at, datetime.utcnow()),
+            (Alert.reporter_count, count + 1)
+        ]
+        result = await db.execute(update(Alert).where(Alert.id == alert_id).ordered_values(*assignments))
+        if result.rowcount == 0:
+            await db.rollback()
+            return None, False
+        await db.commit()
+        
+        result = await db.execute(
+            select(Alert)
+            .options(selectinload(Alert.alert_class))
+            .where(Alert.id == alert_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first(), True
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to merge report into alert {alert_id}: {str(e)}")
+        return None, False
+
+@asynccontextmanager
+async def alert_class_lock(class_id: int, timeout_seconds: float):
+    """
+    Hold a MySQL named lock for a notifiable class while its reports are ingested
+    
+    Serialises alert creation for the class across worker processes. The lock
+    lives on its own connection, since sessions hand theirs back to the pool
+    on commit. Yields whether it was acquired (False after timeout_seconds).
+    """
+    name = f"alert_ingest:{class_id}"
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout_seconds})
+        acquired = result.scalar() == 1
+        if not acquired:
+            logger.warning(f"Could not lock {name}, ingesting without it")
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+async def find_mergeable_alert_async(db: AsyncSession, class_id: int, latitude: float, longitude: float,
+                                     radius_km: float,
+                                     reported_after: datetime) -> Optional[Tuple[int, float, float]]:
+    """
+    Find the nearest unexpired alert of a class within radius_km, reported after reported_after
+    
+    This is a locking read, so it sees alerts other processes committed after
+    the session's transaction started. Returns (alert_id, latitude, longitude)
+    or None if there is none.
+    """
+    try:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Alert.id, Alert.latitude, Alert.longitude)
+            .where(
+                Alert.class_id == class_id,
+                Alert.last_reported_at >= reported_after,
+                or_(Alert.expires_at.is_(None), Alert.expires_at > now),
+                Alert.latitude >= min_lat,
+                Alert.latitude <= max_lat,
+                Alert.longitude >= min_lon,
+                Alert.longitude <= max_lon
+            )
+            .with_for_update(read=True)
+        )
+        best = None
+        for alert_id, alert_lat, alert_lon in result.all():
+            distance = calculate_distance(latitude, longitude, alert_lat, alert_lon)
+            if distance <= radius_km and (best is None or distance < best[0]):
+                best = (distance, alert_id, alert_lat, alert_lon)
+        return best[1:] if best is not None else None
+    except Exception as e:
+        logger.error(f"Failed to look up mergeable alerts: {str(e)}")
+        return None
+
+async def get_alert_async(db: AsyncSession, alert_id: int) -> Optional[Alert]:
+    """Get an alert by ID, with its notifiable class loaded"""
+    result = await db.execute(
+        select(Alert).options(selectinload(Alert.alert_class)).where(Alert.id == alert_id)
+    )
+    return result.scalars().first()
+
+async def get_alerts_in_radius_async(db: AsyncSession, latitude: float, longitude: float, radius_km: float, 
+                                    class_ids: Optional[List[int]] = None, hours_ago: Optional[int] = None,
+                                    include_expired: bool = False) -> List[Dict[str, Any]]:
+    """Get alerts within a radius of a point, sorted by distance"""
+    try:
+        query = alerts_in_radius_query(latitude, longitude, radius_km, class_ids, hours_ago, include_expired)
+        result = await db.execute(query)
+        alerts = _alerts_within_radius(result.mappings().all(), latitude, longitude, radius_km)
+        if alerts:
+            classes = (await db.execute(notifiable_classes_query(alerts))).scalars().all()
+            _attach_alert_classes(alerts, classes)
+        return alerts
+    except Exception as e:
+        logger.error(f"Failed to get alerts in radius: {str(e)}")
+        return []
@@ -0,0 +1,122 @@
+from math import ceil, cos, floor, radians, pi
+from typing import List, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.types import UserDefinedType
+
+# Mean earth radius, the same value the Haversine distance in app.database uses
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = pi * EARTH_RADIUS_KM / 180.0
+
+class Point(UserDefinedType):
+    """
+    MySQL POINT column holding a (latitude, longitude) tuple.
+
+    Points are stored with SRID 0 and x = longitude, y = latitude, which is
+    what ST_Distance_Sphere expects. MySQL only uses a SPATIAL index for a
+    column restricted to one SRID, so the column spec includes it.
+    """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "POINT SRID 0"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            latitude, longitude = value
+            return f"POINT({float(longitude)} {float(latitude)})"
+        return process
+
+    def bind_expression(self, bindvalue):
+        return func.ST_GeomFromText(bindvalue, 0)
+
+    def column_expression(self, col):
+        return func.ST_AsText(col, type_=self)
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None:
+                return None
+            longitude, latitude = value[value.index("(") + 1:value.rindex(")")].split()
+            return float(latitude), float(longitude)
+        return process
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Get (min_lat, max_lat, min_lon, max_lon) of a box containing the circle around a point
+
+    Degrees of longitude shrink with cos(latitude), so the longitude span is
+    widened accordingly; near the poles it covers every longitude.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+
+    # Use the latitude of the box edge closest to a pole, where degrees of longitude are shortest
+    edge_cos = cos(radians(max(abs(min_lat), abs(max_lat))))
+    if edge_cos < 1e-6 or radius_km / (KM_PER_DEGREE * edge_cos) >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    lon_delta = radius_km / (KM_PER_DEGREE * edge_cos)
+    return min_lat, max_lat, longitude - lon_delta, longitude + lon_delta
+
+def grid_cell(latitude: float, longitude: float, cell_degrees: float) -> int:
+    """
+    Number of the grid cell containing a point
+
+    Cells are cell_degrees x cell_degrees and numbered row by row starting
+    at (-90, -180), so the cells of one row form a contiguous range.
+    """
+    columns = ceil(360.0 / cell_degrees) + 1
+    return floor((latitude + 90.0) / cell_degrees) * columns + floor((longitude + 180.0) / cell_degrees)
+
+def grid_cell_ranges(min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                     cell_degrees: float) -> List[Tuple[int, int]]:
+    """Get the (first, last) cell numbers covering a bounding box, one range per grid row"""
+    columns = ceil(360.0 / cell_degrees) + 1
+    min_lon = max(min_lon, -180.0)
+    max_lon = min(max_lon, 180.0)
+    first_col = floor((min_lon + 180.0) / cell_degrees)
+    last_col = floor((max_lon + 180.0) / cell_degrees)
+    return [
+        (row * columns + first_col, row * columns + last_col)
+        for row in range(floor((min_lat + 90.0) / cell_degrees), floor((max_lat + 90.0) / cell_degrees) + 1)
+    ]
+
+def envelope(min_lat: float, max_lat: float, min_lon: float, max_lon: float):
+    """SQL expression for the rectangle covering a bounding box (SRID 0)"""
+    return func.ST_GeomFromText(
+        f"POLYGON(({min_lon} {min_lat}, {max_lon} {min_lat}, {max_lon} {max_lat}, "
+        f"{min_lon} {max_lat}, {min_lon} {min_lat}))",
+        0
+    )
+
+def distance_km(location_column, latitude: float, longitude: float):
+    """SQL expression for the great circle distance in km between a POINT column and a point"""
+    return func.ST_Distance_Sphere(
+        location_column,
+        func.ST_GeomFromText(f"POINT({float(longitude)} {float(latitude)})", 0),
+        EARTH_RADIUS_KM * 1000
+    ) / 1000.0
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great circle distances in km from a point to arrays of points (Haversine formula)"""
+    lat1 = radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def nearest_within_radius(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray,
+                          radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the points within radius_km of a point
+
+    Returns the indices of those points sorted by distance, and the distances of all points
+    """
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    within = np.flatnonzero(distances <= radius_km)
+    return within[np.argsort(distances[within], kind="stable")], distances
@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import LOCATION_BUFFER
+from app.database import get_db, upsert_user_locations, calculate_distance
+
+logger = logging.getLogger("sound-api")
+
+class _TrackedLocation:
+    """A user's latest reported position and the position last written for them"""
+    __slots__ = ("latitude", "longitude", "accuracy", "updated_at", "seen_at",
+                 "written_latitude", "written_longitude", "written_at")
+
+    def __init__(self):
+        self.latitude = 0.0
+        self.longitude = 0.0
+        self.accuracy: Optional[float] = None
+        self.updated_at: Optional[datetime] = None
+        self.seen_at = 0.0
+        self.written_latitude: Optional[float] = None
+        self.written_longitude: Optional[float] = None
+        self.written_at = 0.0
+
+class LocationBuffer:
+    """
+    Write-behind buffer for user locations.
+
+    Requests only record the latest position per user in memory. A
+    background thread writes the positions that changed since the last
+    flush with multi-row upserts, so a user reporting several times between
+    flushes costs one row. Moves smaller than the reported accuracy (or
+    min_move_meters) are not written at all unless the stored location is
+    older than max_write_interval; the in-memory position is always current.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, min_move_meters: float,
+                 max_write_interval: float, retain_seconds: float):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.min_move_meters = min_move_meters
+        self.max_write_interval = max_write_interval
+        self.retain_seconds = retain_seconds
+
+        self._lock = threading.Lock()
+        self._locations: Dict[int, _TrackedLocation] = {}
+        self._dirty: Dict[int, Dict[str, Any]] = {}  # user_id -> row for the next flush
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {"updates": 0, "skipped": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="location-buffer")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Location buffer started")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flush thread and write everything still buffered"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+        logger.info("Location buffer stopped")
+
+    def update(self, user_id: int, latitude: float, longitude: float, accuracy: Optional[float] = None) -> bool:
+        """
+        Record a user's position
+
+        Returns True if the position will be written to the database, False
+        if the move was within the accuracy threshold.
+        """
+        now = time.monotonic()
+        updated_at = datetime.utcnow()
+        with self._lock:
+            self._stats["updates"] += 1
+            location = self._locations.get(user_id)
+            if location is None:
+                location = self._locations[user_id] = _TrackedLocation()
+            location.latitude = latitude
+            location.longitude = longitude
+            location.accuracy = accuracy
+            location.updated_at = updated_at
+            location.seen_at = now
+
+            if not self._needs_write(location, now):
+                self._stats["skipped"] += 1
+                return False
+
+            location.written_latitude = latitude
+            location.written_longitude = longitude
+            location.written_at = now
+            self._dirty[user_id] = {
+                "user_id": user_id,
+                "latitude": latitude,
+                "longitude": longitude,
+                "accuracy": accuracy,
+                "last_updated": updated_at
+            }
+            return True
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get the latest position reported to this process, written or not"""
+        with self._lock:
+            location = self._locations.get(user_id)
+            if location is None:
+                return None
+            return {
+                "latitude": location.latitude,
+                "longitude": location.longitude,
+                "accuracy": location.accuracy,
+                "last_updated": location.updated_at
+            }
+
+    def flush(self) -> int:
+        """Write all buffered positions, returns the number of rows written"""
+        with self._lock:
+            rows = list(self._dirty.values())
+            self._dirty = {}
+
+        written = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            db = get_db()
+            try:
+                count = upsert_user_locations(db, batch)
+            finally:
+                db.close()
+
+            if count:
+                written += count
+            else:
+                self._requeue(batch)
+                with self._lock:
+                    self._stats["failed"] += len(batch)
+
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["written"] += written
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters and the number of tracked and pending users"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked"] = len(self._locations)
+            stats["pending"] = len(self._dirty)
+        return stats
+
+    def _needs_write(self, location: _TrackedLocation, now: float) -> bool:
+        if location.written_latitude is None or now - location.written_at >= self.max_write_interval:
+            return True
+        moved_meters = calculate_distance(
+            location.written_latitude, location.written_longitude, location.latitude, location.longitude
+        ) * 1000
+        return moved_meters >= max(location.accuracy or 0.0, self.min_move_meters)
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        """Put rows from a failed flush back, unless a newer position was buffered meanwhile"""
+        with self._lock:
+            for row in rows:
+                self._dirty.setdefault(row["user_id"], row)
+
+    def _forget_stale(self) -> None:
+        cutoff = time.monotonic() - self.retain_seconds
+        with self._lock:
+            stale = [user_id for user_id, location in self._locations.items()
+                     if location.seen_at < cutoff and user_id not in self._dirty]
+            for user_id in stale:
+                del self._locations[user_id]
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                written = self.flush()
+                if written:
+                    logger.info(f"Wrote {written} buffered user locations")
+                self._forget_stale()
+            except Exception as e:
+                logger.error(f"Location buffer flush failed: {str(e)}")
+
+# Shared buffer, started and stopped by the application lifespan
+location_buffer = LocationBuffer(
+    flush_interval=LOCATION_BUFFER["flush_interval_seconds"],
+    batch_size=LOCATION_BUFFER["batch_size"],
+    min_move_meters=LOCATION_BUFFER["min_move_meters"],
+    max_write_interval=LOCATION_BUFFER["max_write_interval_seconds"],
+    retain_seconds=LOCATION_BUFFER["retain_seconds"]
+)
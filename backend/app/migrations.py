@@ -0,0 +1,188 @@
+import logging
+from math import ceil
+from datetime import datetime
+from typing import Callable, Dict, List, Set, Tuple
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, insert, delete, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import ALERT_RETENTION, ALERT_SPATIAL_INDEX, RECIPIENT_INDEX
+from app.models import Base
+
+logger = logging.getLogger("sound-api")
+
+# MySQL named lock held while migrating, so worker processes starting together take turns
+MIGRATION_LOCK_NAME = "schema_migrations"
+MIGRATION_LOCK_TIMEOUT_SECONDS = 600
+
+# Applied migration versions are tracked in their own table, outside the model metadata
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+def create_missing_indexes(conn: Connection, table_name: str, index_names: List[str]) -> None:
+    """Create indexes defined on a model table that don't exist in the database yet"""
+    table = Base.metadata.tables[table_name]
+    existing = {index["name"] for index in inspect(conn).get_indexes(table_name)}
+
+    for index in table.indexes:
+        if index.name in index_names and index.name not in existing:
+            index.create(conn)
+            logger.info(f"Created index {index.name} on {table_name}")
+
+def _001_query_indexes(conn: Connection) -> None:
+    create_missing_indexes(conn, "alerts", [
+        "ix_alerts_created_at_lat_lon",
+        "ix_alerts_class_id_created_at",
+        "ix_alerts_lat_lon"
+    ])
+    create_missing_indexes(conn, "last_predictions", ["ix_last_predictions_created_at"])
+    create_missing_indexes(conn, "evaluations", ["ix_evaluations_class_success_confidence"])
+
+def _002_alert_locations(conn: Connection) -> None:
+    columns = {column["name"] for column in inspect(conn).get_columns("alerts")}
+    if "location" not in columns:
+        # Add the column as nullable, fill it, then make it NOT NULL as SPATIAL indexes require
+        conn.execute(text("ALTER TABLE alerts ADD COLUMN location POINT SRID 0 NULL"))
+        conn.execute(text("UPDATE alerts SET location = Point(longitude, latitude)"))
+        conn.execute(text("ALTER TABLE alerts MODIFY location POINT NOT NULL SRID 0"))
+        logger.info("Added and backfilled alerts.location")
+    create_missing_indexes(conn, "alerts", ["ix_alerts_location"])
+
+def _revert_002_alert_locations(conn: Connection) -> None:
+    columns = {column["name"] for column in inspect(conn).get_columns("alerts")}
+    if "location" in columns:
+        indexes = {index["name"] for index in inspect(conn).get_indexes("alerts")}
+        if "ix_alerts_location" in indexes:
+            conn.execute(text("ALTER TABLE alerts DROP INDEX ix_alerts_location"))
+        conn.execute(text("ALTER TABLE alerts DROP COLUMN location"))
+        logger.info("Dropped alerts.location, the spatial strategy is off")
+
+def _003_alert_expiry(conn: Connection) -> None:
+    # Alerts created before expiry was enforced get the default lifetime
+    result = conn.execute(
+        text("UPDATE alerts SET expires_at = created_at + INTERVAL :hours HOUR WHERE expires_at IS NULL"),
+        {"hours": ALERT_RETENTION["default_ttl_hours"]}
+    )
+    if result.rowcount:
+        logger.info(f"Set expires_at on {result.rowcount} alerts")
+    create_missing_indexes(conn, "alerts", ["ix_alerts_expires_at"])
+
+def _004_alert_reports(conn: Connection) -> None:
+    for table_name in ("alerts", "alerts_archive"):
+        columns = {column["name"] for column in inspect(conn).get_columns(table_name)}
+        if "reporter_count" not in columns:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN reporter_count INTEGER NOT NULL DEFAULT 1"))
+        if "last_reported_at" not in columns:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN last_reported_at DATETIME NULL"))
+            conn.execute(text(f"UPDATE {table_name} SET last_reported_at = created_at"))
+            logger.info(f"Added report tracking columns to {table_name}")
+
+def _005_user_location_cells(conn: Connection) -> None:
+    columns = {column["name"] for column in inspect(conn).get_columns("user_locations")}
+    if "grid_cell" not in columns:
+        conn.execute(text("ALTER TABLE user_locations ADD COLUMN grid_cell INTEGER NULL"))
+    # Same numbering as app.geo.grid_cell
+    cell_degrees = RECIPIENT_INDEX["cell_degrees"]
+    result = conn.execute(
+        text(
+            "UPDATE user_locations SET grid_cell = "
+            "FLOOR((latitude + 90) / :cell_degrees) * :columns + FLOOR((longitude + 180) / :cell_degrees) "
+            "WHERE grid_cell IS NULL"
+        ),
+        {"cell_degrees": cell_degrees, "columns": ceil(360.0 / cell_degrees) + 1}
+    )
+    if result.rowcount:
+        logger.info(f"Set grid_cell on {result.rowcount} user locations")
+    create_missing_indexes(conn, "user_locations", ["ix_user_locations_cell_updated"])
+
+def _006_alert_reporters(conn: Connection) -> None:
+    Base.metadata.tables["alert_reporters"].create(conn, checkfirst=True)
+    # Devices merged into existing alerts were only known in memory; record at least the creators
+    result = conn.execute(text(
+        "INSERT IGNORE INTO alert_reporters (alert_id, device_id) SELECT id, device_id FROM alerts"
+    ))
+    if result.rowcount:
+        logger.info(f"Recorded the reporting device of {result.rowcount} alerts")
+
+# Ordered list of (version, description, migration function).
+# Migrations must be idempotent: on a fresh database create_all has already
+# created the current schema, and they only record their version.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Indexes for alert radius, prediction and evaluation queries", _001_query_indexes),
+    (2, "Spatial location column and index for alerts", _002_alert_locations),
+    (3, "Backfill alert expiry times and index expires_at", _003_alert_expiry),
+    (4, "Reporter count and last report time for merged alerts", _004_alert_reports),
+    (5, "Grid cells for recipient lookups on user locations", _005_user_location_cells),
+    (6, "Devices that reported each alert", _006_alert_reporters),
+]
+
+# Migrations that only apply with some settings: version -> (enabled, revert function).
+# Disabled migrations are not recorded, so they run at the first startup after the
+# setting is turned on, and are reverted if they were applied while it was on.
+OPTIONAL_MIGRATIONS: Dict[int, Tuple[bool, Callable[[Connection], None]]] = {
+    2: (ALERT_SPATIAL_INDEX, _revert_002_alert_locations)
+}
+
+def get_applied_versions(conn: Connection) -> Set[int]:
+    """Get the migration versions already applied to the database"""
+    return set(conn.execute(select(schema_migrations.c.version)).scalars().all())
+
+def apply_migrations(engine: Engine) -> int:
+    """
+    Apply pending migrations in version order
+
+    Every worker process runs this at startup. On MySQL the workers take
+    turns through a named lock, and the applied versions are read after it
+    is taken, so each migration runs once.
+
+    Returns the number of migrations applied
+    """
+    with engine.connect() as lock_conn:
+        locked = lock_conn.dialect.name == "mysql"
+        if locked:
+            acquired = lock_conn.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"),
+                {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT_SECONDS}
+            ).scalar()
+            if acquired != 1:
+                raise RuntimeError(f"Timed out waiting for the {MIGRATION_LOCK_NAME} lock")
+        try:
+            return _apply_pending_migrations(engine)
+        finally:
+            if locked:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+def _apply_pending_migrations(engine: Engine) -> int:
+    schema_migrations.create(engine, checkfirst=True)
+
+    applied_count = 0
+    for version, description, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            applied = get_applied_versions(conn)
+            enabled, revert = OPTIONAL_MIGRATIONS.get(version, (True, None))
+            if not enabled:
+                if version in applied:
+                    logger.info(f"Reverting migration {version}: {description}")
+                    revert(conn)
+                    conn.execute(delete(schema_migrations).where(schema_migrations.c.version == version))
+                continue
+            if version in applied:
+                continue
+
+            logger.info(f"Applying migration {version}: {description}")
+            migrate(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+            applied_count += 1
+
+    if applied_count:
+        logger.info(f"Applied {applied_count} database migrations")
+    return applied_count
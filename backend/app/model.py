@@ -13,9 +13,13 @@ from io import BytesIO
 from PIL import Image
 
 from app.config import MODEL_PATH, MODEL_SHAPE, FEATURE_REDUCTION, BASE_DIR
+from app.configure_tensorflow import configure_tensorflow
 
 logger = logging.getLogger("sound-api")
 
+# GPU memory growth and mixed precision must be set before TensorFlow creates its devices
+configure_tensorflow()
+
 # Global variables for the model
 model = None
 base_model = None
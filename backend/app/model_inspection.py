@@ -4,9 +4,12 @@ import logging
 import os
 
 from app.config import MODEL_PATH, MODEL_SHAPE
+from app.configure_tensorflow import configure_tensorflow
 
 logger = logging.getLogger("sound-api")
 
+configure_tensorflow()
+
 def inspect_model_layers(model_path=MODEL_PATH):
     """
     Inspect each layer of the model and print detailed information
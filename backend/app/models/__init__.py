@@ -1,17 +1,20 @@
 from app.models.base import Base
 from app.models.user import User
-from app.models.evaluation import Evaluation
+from app.models.evaluation import Evaluation, EvaluationClassStats
 from app.models.prediction import Prediction
 from app.models.notifiable_class import NotifiableClass
 from app.models.location import UserLocation
-from app.models.alert import Alert
+from app.models.alert import Alert, AlertReporter, AlertArchive
 
 __all__ = [
     "Base", 
     "User", 
     "Evaluation", 
+    "EvaluationClassStats",
     "Prediction",
     "NotifiableClass",
     "UserLocation",
-    "Alert"
+    "Alert",
+    "AlertReporter",
+    "AlertArchive"
 ]
\ No newline at end of file
@@ -1,23 +1,96 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, event, inspect
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.models.base import Base
+from app.config import ALERT_SPATIAL_INDEX
+from app.geo import Point
 
 class Alert(Base):
-    """Alerts created by users for notifiable sound classes"""
+    """
+    Alerts created by users for notifiable sound classes
+    
+    Reports of the same class close in space and time are merged into one
+    alert: latitude/longitude hold the centroid of the reports, confidence
+    the highest reported confidence.
+    """
     __tablename__ = "alerts"
+    __table_args__ = (
+        # Radius queries: time window + bounding box, with or without a class filter
+        Index("ix_alerts_created_at_lat_lon", "created_at", "latitude", "longitude"),
+        Index("ix_alerts_class_id_created_at", "class_id", "created_at"),
+        # Radius queries without a time window
+        Index("ix_alerts_lat_lon", "latitude", "longitude"),
+        # Expiry filter and the archiving reaper
+        Index("ix_alerts_expires_at", "expires_at"),
+    ) + (
+        # Radius queries with the spatial strategy (MBRContains on location)
+        (Index("ix_alerts_location", "location", mysql_prefix="SPATIAL"),) if ALERT_SPATIAL_INDEX else ()
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     class_id = Column(Integer, ForeignKey("notifiable_classes.id"), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    if ALERT_SPATIAL_INDEX:
+        # Copy of latitude/longitude for the spatial index, kept in sync on insert/update
+        location = deferred(Column(Point, nullable=False))
     confidence = Column(Float, nullable=False)
     device_id = Column(String(255), nullable=False)
     is_verified = Column(Boolean, default=False)
+    reporter_count = Column(Integer, nullable=False, default=1, server_default="1")  # Reports merged into this alert
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_reported_at = Column(DateTime, default=datetime.utcnow)  # Time of the latest merged report
     expires_at = Column(DateTime, nullable=True)  # When this alert should expire
     
     # Relationships
     user = relationship("User", back_populates="alerts")
-    alert_class = relationship("NotifiableClass", back_populates="alerts")
\ No newline at end of file
+    alert_class = relationship("NotifiableClass", back_populates="alerts")
+
+class AlertReporter(Base):
+    """
+    Devices that reported an alert, including the one that created it
+    
+    The primary key makes a device count once per alert, whichever worker
+    process handles its reports.
+    """
+    __tablename__ = "alert_reporters"
+    
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True, autoincrement=False)
+    device_id = Column(String(255), primary_key=True)
+
+class AlertArchive(Base):
+    """Expired alerts moved out of the alerts table by the reaper"""
+    __tablename__ = "alerts_archive"
+    __table_args__ = (
+        # Retention cleanup
+        Index("ix_alerts_archive_created_at", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Same ID as in alerts
+    user_id = Column(Integer, nullable=True)
+    class_id = Column(Integer, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    confidence = Column(Float, nullable=False)
+    device_id = Column(String(255), nullable=False)
+    is_verified = Column(Boolean, default=False)
+    reporter_count = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(DateTime)
+    last_reported_at = Column(DateTime)
+    expires_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+def set_alert_location(mapper, connection, alert):
+    """Fill the spatial location column from latitude/longitude"""
+    alert.location = (alert.latitude, alert.longitude)
+
+def update_alert_location(mapper, connection, alert):
+    """Keep the spatial location column in sync when an alert is moved"""
+    state = inspect(alert)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        alert.location = (alert.latitude, alert.longitude)
+
+if ALERT_SPATIAL_INDEX:
+    event.listen(Alert, "before_insert", set_alert_location)
+    event.listen(Alert, "before_update", update_alert_location)
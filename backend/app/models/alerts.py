@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from app.config import ALERT_SUBSCRIPTIONS
+
 class LocationBase(BaseModel):
     """Base model for location data"""
     latitude: float = Field(..., ge=-90, le=90)
@@ -12,6 +14,13 @@ class UserLocationUpdate(LocationBase):
     """Model for updating user location"""
     pass
 
+class UserLocationResponse(LocationBase):
+    """Model for a user's last known location"""
+    last_updated: Optional[datetime] = None
+    
+    class Config:
+        orm_mode = True
+
 class NotifiableClassCreate(BaseModel):
     """Model for creating a notifiable sound class"""
     class_name: str = Field(..., min_length=2, max_length=100)
@@ -53,6 +62,7 @@ class AlertResponse(BaseModel):
     confidence: float
     device_id: str
     is_verified: bool
+    reporter_count: int = 1
     created_at: datetime
     alert_class: NotifiableClassResponse
     distance_km: Optional[float] = None
@@ -60,8 +70,19 @@ class AlertResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class AlertRecipient(BaseModel):
+    """A user within notification range of an alert"""
+    user_id: int
+    distance_km: float
+
+class AlertSubscription(LocationBase):
+    """Message sent over /alerts/subscribe to set or move a subscription"""
+    radius_km: float = Field(1.0, gt=0, le=ALERT_SUBSCRIPTIONS["max_radius_km"])
+    class_ids: Optional[List[int]] = None
+
 class AlertQueryParams(LocationBase):
     """Query parameters for getting nearby alerts"""
     radius_km: float = Field(1.0, gt=0)
     class_ids: Optional[List[int]] = None
-    hours_ago: Optional[int] = Field(None, ge=0)
\ No newline at end of file
+    hours_ago: Optional[int] = Field(None, ge=0)
+    include_expired: bool = False
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -6,6 +6,10 @@ from app.models.base import Base
 class Evaluation(Base):
     """Model for user evaluations of sound classifications"""
     __tablename__ = "evaluations"
+    __table_args__ = (
+        # Covers the per-class aggregation used to rebuild evaluation_class_stats
+        Index("ix_evaluations_class_success_confidence", "detection_class", "success", "detection_confidence"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for backward compatibility
@@ -18,4 +22,14 @@ class Evaluation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    user = relationship("User", back_populates="evaluations")
\ No newline at end of file
+    user = relationship("User", back_populates="evaluations")
+
+class EvaluationClassStats(Base):
+    """Per-class rollup of evaluations, updated incrementally by add_evaluation"""
+    __tablename__ = "evaluation_class_stats"
+    
+    detection_class = Column(String(100), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    successful = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, event, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
+from app.config import RECIPIENT_INDEX
+from app.geo import grid_cell
 
 class UserLocation(Base):
     """User's last known location"""
@@ -12,7 +14,25 @@ class UserLocation(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     accuracy = Column(Float, nullable=True)  # in meters
+    grid_cell = Column(Integer, nullable=True)  # see app.geo.grid_cell, for recipient lookups
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    user = relationship("User", back_populates="last_location")
\ No newline at end of file
+    user = relationship("User", back_populates="last_location")
+    
+    __table_args__ = (
+        # Recipient lookups read the cells around an alert, restricted to recent locations
+        Index("ix_user_locations_cell_updated", "grid_cell", "last_updated"),
+    )
+
+@event.listens_for(UserLocation, "before_insert")
+def set_location_cell(mapper, connection, location):
+    """Fill the grid cell from latitude/longitude"""
+    location.grid_cell = grid_cell(location.latitude, location.longitude, RECIPIENT_INDEX["cell_degrees"])
+
+@event.listens_for(UserLocation, "before_update")
+def update_location_cell(mapper, connection, location):
+    """Keep the grid cell in sync when a user moves"""
+    state = inspect(location)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        location.grid_cell = grid_cell(location.latitude, location.longitude, RECIPIENT_INDEX["cell_degrees"])
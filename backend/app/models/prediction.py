@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -6,6 +6,10 @@ from app.models.base import Base
 class Prediction(Base):
     """Model for storing prediction results"""
     __tablename__ = "last_predictions"
+    __table_args__ = (
+        # Latest-first listing and pruning
+        Index("ix_last_predictions_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for guest predictions
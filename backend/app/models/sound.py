@@ -1,7 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from app.config import MAX_BULK_EVALUATIONS
+from app.models.alerts import AlertResponse
+
 class EvaluationRequest(BaseModel):
     """Request model for submitting a user evaluation"""
     device_id: str
@@ -11,6 +14,11 @@ class EvaluationRequest(BaseModel):
     detection_confidence: float
     success: bool  # True for successful prediction, False for unsuccessful
 
+class BulkEvaluationRequest(BaseModel):
+    """Request model for submitting several evaluations at once (e.g. after being offline)"""
+    evaluations: List[EvaluationRequest] = Field(..., min_items=1, max_items=MAX_BULK_EVALUATIONS)
+
 class PredictionResponse(BaseModel):
     """Model for prediction response"""
-    predictions: Dict[str, float]
\ No newline at end of file
+    predictions: Dict[str, float]
+    alert: Optional[AlertResponse] = None  # Alert created from this prediction, if any
\ No newline at end of file
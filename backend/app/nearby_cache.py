@@ -0,0 +1,129 @@
+import asyncio
+from bisect import bisect_left
+from math import floor, sqrt
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+from app.cache import TTLCache
+from app.config import NEARBY_CACHE
+from app.database import calculate_distance
+from app.geo import KM_PER_DEGREE, nearest_within_radius
+
+# Fetches the alerts within a radius of a point: (latitude, longitude, radius_km) -> alert dictionaries
+AlertFetcher = Callable[[float, float, float], Awaitable[List[Dict[str, Any]]]]
+
+class _CachedArea:
+    """Alerts around the center of a grid cell, with their coordinates as arrays for refinement"""
+    __slots__ = ("latitude", "longitude", "radius_km", "alerts", "latitudes", "longitudes")
+
+    def __init__(self, latitude: float, longitude: float, radius_km: float, alerts: List[Dict[str, Any]]):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km
+        self.alerts = alerts
+        self.latitudes = np.fromiter((alert["latitude"] for alert in alerts), dtype=np.float64, count=len(alerts))
+        self.longitudes = np.fromiter((alert["longitude"] for alert in alerts), dtype=np.float64, count=len(alerts))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        return calculate_distance(self.latitude, self.longitude, latitude, longitude) <= self.radius_km
+
+class NearbyResponseCache:
+    """
+    Short-lived cache of /alerts/nearby database results, shared by nearby callers.
+
+    Requests are keyed on the grid cell of their position, their radius
+    rounded up to a bucket, class_ids, hours_ago and include_expired. A miss
+    fetches every alert within the bucket radius of any point in the cell,
+    so each caller's own result is cut from the cached set by exact distance.
+    Concurrent misses for one key wait for a single fetch. Entries whose
+    area contains a new alert, or the old or new position of a merged one,
+    are dropped.
+    """
+
+    def __init__(self, cell_degrees: float, radius_buckets_km: List[float], ttl_seconds: float, max_entries: int):
+        self.cell_degrees = cell_degrees
+        self.radius_buckets_km = sorted(radius_buckets_km)
+        self.ttl_seconds = ttl_seconds
+
+        self._cache = TTLCache(max_entries, ttl_seconds)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Distance from a cell's center to its corners, at most (longitude degrees are never longer)
+        self._half_diagonal_km = sqrt(2) / 2 * cell_degrees * KM_PER_DEGREE
+        self._stats = {"fetches": 0, "shared_fetches": 0, "uncacheable": 0, "invalidated": 0}
+
+    async def get_alerts(self, latitude: float, longitude: float, radius_km: float,
+                         class_ids: Optional[List[int]], hours_ago: Optional[int], include_expired: bool,
+                         fetch: AlertFetcher) -> List[Dict[str, Any]]:
+        """Get the alerts within radius_km of a point, nearest first, from the cache or through fetch"""
+        bucket = bisect_left(self.radius_buckets_km, radius_km)
+        if bucket == len(self.radius_buckets_km):
+            self._stats["uncacheable"] += 1
+            return await fetch(latitude, longitude, radius_km)
+
+        row, col = floor(latitude / self.cell_degrees), floor(longitude / self.cell_degrees)
+        key = (row, col, bucket, tuple(sorted(set(class_ids))) if class_ids else None, hours_ago, include_expired)
+
+        area = self._cache.get(key)
+        if area is None:
+            area = await self._fetch_shared(key, row, col, self.radius_buckets_km[bucket], fetch)
+        return self._refine(area, latitude, longitude, radius_km)
+
+    def invalidate(self, latitude: float, longitude: float) -> int:
+        """Drop the cached areas containing a point, returns the number of dropped entries"""
+        dropped = self._cache.delete_where(lambda _, area: area.contains(latitude, longitude))
+        self._stats["invalidated"] += dropped
+        return dropped
+
+    def invalidate_points(self, points: List[Tuple[float, float]]) -> None:
+        """Drop the cached areas containing any of a list of (latitude, longitude) points"""
+        for latitude, longitude in points:
+            self.invalidate(latitude, longitude)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size, hit rates and fetch counters"""
+        stats = self._cache.get_stats()
+        stats.update(self._stats)
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+    async def _fetch_shared(self, key: Hashable, row: int, col: int, bucket_km: float,
+                            fetch: AlertFetcher) -> _CachedArea:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["shared_fetches"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            center_lat = (row + 0.5) * self.cell_degrees
+            center_lon = (col + 0.5) * self.cell_degrees
+            radius_km = bucket_km + self._half_diagonal_km
+            self._stats["fetches"] += 1
+            area = _CachedArea(center_lat, center_lon, radius_km, await fetch(center_lat, center_lon, radius_km))
+            self._cache.set(key, area)
+            future.set_result(area)
+            return area
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise the error; don't warn about it being never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    def _refine(area: _CachedArea, latitude: float, longitude: float, radius_km: float) -> List[Dict[str, Any]]:
+        order, distances = nearest_within_radius(latitude, longitude, area.latitudes, area.longitudes, radius_km)
+        return [
+            dict(area.alerts[index], distance_km=distance)
+            for index, distance in zip(order.tolist(), distances[order].tolist())
+        ]
+
+# Shared cache used by /alerts/nearby
+nearby_cache = NearbyResponseCache(
+    cell_degrees=NEARBY_CACHE["cell_degrees"],
+    radius_buckets_km=NEARBY_CACHE["radius_buckets_km"],
+    ttl_seconds=NEARBY_CACHE["ttl_seconds"],
+    max_entries=NEARBY_CACHE["max_entries"]
+)
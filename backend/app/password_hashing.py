@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from passlib.context import CryptContext
+
+from app.config import PASSWORD_HASHING
+
+logger = logging.getLogger("sound-api")
+
+# Password hashing context. Hashes made with a different cost factor are
+# reported by needs_update/verify_and_update so they can be upgraded on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=PASSWORD_HASHING["bcrypt_rounds"],
+    bcrypt__min_rounds=PASSWORD_HASHING["bcrypt_rounds"],
+    bcrypt__max_rounds=PASSWORD_HASHING["bcrypt_rounds"]
+)
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing operations are already queued"""
+    pass
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so worker threads run in parallel
+    without blocking the event loop. The number of queued operations is
+    capped; beyond that PasswordHasherBusy is raised instead of letting a
+    login burst queue up unbounded work.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "max_pending_seen": 0,
+            "total_wait_seconds": 0.0,
+            "total_run_seconds": 0.0
+        }
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self._submit(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and return a new hash if the stored one uses outdated settings
+
+        Returns (valid, new_hash); new_hash is None when no rehash is needed
+        """
+        return await self._submit(self.context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and timing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+        completed = stats["completed"]
+        stats["max_workers"] = self.max_workers
+        stats["max_pending"] = self.max_pending
+        stats["avg_wait_ms"] = stats["total_wait_seconds"] / completed * 1000 if completed else 0.0
+        stats["avg_run_ms"] = stats["total_run_seconds"] / completed * 1000 if completed else 0.0
+        return stats
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PasswordHasherBusy(f"{self._pending} password operations already pending")
+            self._pending += 1
+            self._stats["max_pending_seen"] = max(self._stats["max_pending_seen"], self._pending)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._run, time.monotonic(), func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _run(self, submitted_at: float, func: Callable, *args) -> Any:
+        started_at = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.monotonic()
+            with self._lock:
+                self._stats["completed"] += 1
+                self._stats["total_wait_seconds"] += started_at - submitted_at
+                self._stats["total_run_seconds"] += finished_at - started_at
+
+# Shared hasher used by the authentication routes
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=PASSWORD_HASHING["max_workers"],
+    max_pending=PASSWORD_HASHING["max_pending"]
+)
@@ -0,0 +1,164 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from app.config import PREDICTION_LOGGING
+from app.database import get_db, add_predictions_bulk, prune_predictions
+
+logger = logging.getLogger("sound-api")
+
+class PredictionWriter:
+    """
+    Write-behind queue for prediction records.
+
+    Requests only enqueue a record; a background thread writes queued records
+    with a single multi-row INSERT and prunes old rows periodically.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float,
+                 prune_interval: float, max_rows: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self.max_rows = max_rows
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    def start(self) -> None:
+        """Start the background writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="prediction-writer")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Prediction writer started")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer and flush everything still queued"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                # The thread is still draining; draining here too would race it for the queue
+                logger.warning(f"Prediction writer did not stop within {timeout}s, "
+                               f"leaving its queue to the writer thread")
+                return
+            self._thread = None
+        # Anything left over (e.g. when the writer was never started) is written here
+        self._drain()
+        logger.info("Prediction writer stopped")
+
+    def submit(self, user_id: Optional[int], file_name: str, file_path: str,
+               highest_class: str, highest_confidence: float, all_predictions: Dict) -> bool:
+        """
+        Queue a prediction for writing.
+
+        Returns False if the queue is full and the record was dropped.
+        """
+        record = {
+            "user_id": user_id,
+            "file_name": file_name,
+            "file_path": file_path,
+            "highest_class": highest_class,
+            "highest_confidence": highest_confidence,
+            "all_predictions": all_predictions,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            logger.warning(f"Prediction queue is full, dropping prediction for {file_name}")
+            return False
+
+        self._count("queued")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters and the current queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _run(self) -> None:
+        last_prune = time.monotonic()
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+            if time.monotonic() - last_prune >= self.prune_interval:
+                self._prune()
+                last_prune = time.monotonic()
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        """Wait for up to batch_size records or until the flush interval passes"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> None:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        db = get_db()
+        try:
+            written = add_predictions_bulk(db, batch)
+        finally:
+            db.close()
+
+        self._count("flushes")
+        if written:
+            self._count("written", written)
+            logger.info(f"Wrote {written} queued predictions")
+        else:
+            self._count("failed", len(batch))
+
+    def _prune(self) -> None:
+        db = get_db()
+        try:
+            deleted = prune_predictions(db, keep=self.max_rows)
+            if deleted:
+                logger.info(f"Pruned {deleted} old predictions")
+        finally:
+            db.close()
+
+# Shared writer instance, started and stopped by the application lifespan
+prediction_writer = PredictionWriter(
+    queue_size=PREDICTION_LOGGING["queue_size"],
+    batch_size=PREDICTION_LOGGING["batch_size"],
+    flush_interval=PREDICTION_LOGGING["flush_interval_seconds"],
+    prune_interval=PREDICTION_LOGGING["prune_interval_seconds"],
+    max_rows=PREDICTION_LOGGING["max_rows"]
+)
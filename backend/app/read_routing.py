@@ -0,0 +1,76 @@
+import threading
+import time
+from math import ceil
+from typing import Any, Callable, Dict, Optional
+from fastapi import Request, Response
+
+from app.config import READ_ROUTING
+
+# Requests with these methods don't change data
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Cookie and header carrying the time of a client's last write (Unix seconds)
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+class ReadRouter:
+    """
+    Decides whether a read-only request may be served by the read replica.
+
+    A client that has just written is pinned to the primary for a short
+    window, so it reads its own writes even while the replica lags behind.
+    The time of the write travels with the client rather than being kept
+    in this process: successful writes return it in the last_write cookie
+    and the X-Last-Write header, and reads carrying a recent one (cookie or
+    echoed header) use the primary, whichever worker serves them. Clients
+    that neither keep cookies nor echo the header read from the replica.
+    """
+
+    def __init__(self, sticky_seconds: float, clock: Callable[[], float] = time.time):
+        self.sticky_seconds = sticky_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {
+            "replica_reads": 0,
+            "primary_reads": 0,
+            "writes_tracked": 0
+        }
+
+    @staticmethod
+    def last_write(request: Request) -> Optional[float]:
+        """Time of the client's last write as sent with the request, if any"""
+        value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def mark_write(self, response: Response) -> None:
+        """Hand the client of a successful write request the marker that pins it to the primary"""
+        if self.sticky_seconds <= 0:
+            return
+        value = f"{self.clock():.3f}"
+        response.headers[LAST_WRITE_HEADER] = value
+        response.set_cookie(LAST_WRITE_COOKIE, value, max_age=ceil(self.sticky_seconds),
+                            httponly=True, samesite="lax")
+        with self._lock:
+            self._stats["writes_tracked"] += 1
+
+    def use_replica(self, request: Request) -> bool:
+        """Check whether a read for this request may go to the replica"""
+        last_write = self.last_write(request)
+        # Markers slightly in the future count too, for clock skew between API hosts
+        replica = last_write is None or abs(self.clock() - last_write) >= self.sticky_seconds
+        with self._lock:
+            self._stats["replica_reads" if replica else "primary_reads"] += 1
+        return replica
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["sticky_seconds"] = self.sticky_seconds
+        return stats
+
+# Shared router used by the read-only database dependencies
+read_router = ReadRouter(READ_ROUTING["sticky_seconds"])
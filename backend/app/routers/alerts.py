@@ -1,25 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import asyncio
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+from typing import List, Optional
 
 from app.models.alerts import (
-    UserLocationUpdate, NotifiableClassCreate, NotifiableClassUpdate,
-    NotifiableClassResponse, AlertCreate, AlertResponse, AlertQueryParams
+    UserLocationUpdate, UserLocationResponse, NotifiableClassCreate, NotifiableClassUpdate,
+    NotifiableClassResponse, AlertCreate, AlertResponse, AlertQueryParams, AlertSubscription, AlertRecipient
 )
 from app.database import (
-    get_db_session, User, NotifiableClass, Alert, 
-    create_notifiable_class, get_notifiable_class_by_name, get_notifiable_class_by_id,
-    get_active_notifiable_classes, update_notifiable_class, update_user_location, 
-    create_alert, get_alerts_in_radius
+    get_db_session, get_async_db_session, get_async_read_db_session, AsyncSessionLocal, User, Alert, 
+    create_notifiable_class, get_notifiable_class_by_name, update_notifiable_class,
+    get_user_location_async, get_alerts_in_radius_async, get_alert_async, get_alert_recipients_async
 )
-from app.auth import get_current_active_user, check_admin_privilege, get_optional_current_user
+from app.auth import get_current_active_user, check_admin_privilege, get_optional_current_user, get_user_from_token
+from app.alert_index import live_alert_index
+from app.alert_subscriptions import alert_hub
+from app.alert_ingest import ingest_alert
+from app.config import RECIPIENT_INDEX, NEARBY_CACHE
+from app.class_catalog import class_catalog
+from app.location_buffer import location_buffer
+from app.nearby_cache import nearby_cache
 
 router = APIRouter(
     prefix="/alerts",
     tags=["alert-system"]
 )
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check whether a request's If-None-Match header matches an ETag"""
+    if_none_match = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+    return etag in if_none_match or f"W/{etag}" in if_none_match or "*" in if_none_match
+
 # Notifiable Classes Management (Admin only)
 @router.post("/classes", response_model=NotifiableClassResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_notifiable_class(
@@ -55,11 +70,12 @@ async def create_new_notifiable_class(
             detail="Failed to create notifiable class"
         )
     
+    class_catalog.invalidate()
     return notifiable_class
 
 @router.get("/classes", response_model=List[NotifiableClassResponse])
 async def get_notifiable_classes(
-    db: Session = Depends(get_db_session),
+    request: Request,
     include_inactive: bool = False,
     current_user: User = Depends(get_optional_current_user)
 ):
@@ -68,6 +84,9 @@ async def get_notifiable_classes(
     
     By default, only active classes are returned. Set include_inactive=true to get all classes.
     This endpoint is public and does not require authentication.
+    
+    Responses carry an ETag; send it back in If-None-Match to get 304 Not Modified
+    when the classes haven't changed.
     """
     # Admin check only if include_inactive=true and user is authenticated
     if include_inactive and current_user and current_user.privilege != "admin" and current_user.privilege != "super_admin":
@@ -76,25 +95,27 @@ async def get_notifiable_classes(
             detail="Only admin users can view inactive classes"
         )
     
-    if include_inactive and current_user and (current_user.privilege == "admin" or current_user.privilege == "super_admin"):
-        # For admins, get all classes
-        classes = db.query(NotifiableClass).all()
-    else:
-        # For normal users and unauthenticated users, get only active classes
-        classes = get_active_notifiable_classes(db)
+    # Admins get all classes, normal and unauthenticated users only active ones
+    show_inactive = include_inactive and current_user is not None and \
+        (current_user.privilege == "admin" or current_user.privilege == "super_admin")
     
-    return classes
+    body, etag = await class_catalog.get_response(include_inactive=show_inactive)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Authorization"}
+    
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/classes/{class_id}", response_model=NotifiableClassResponse)
 async def get_notifiable_class(
     class_id: int,
-    db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get a specific notifiable sound class by ID
     """
-    notifiable_class = get_notifiable_class_by_id(db, class_id)
+    notifiable_class = await class_catalog.get_by_id(class_id)
     
     if not notifiable_class:
         raise HTTPException(
@@ -135,42 +156,62 @@ async def update_notifiable_class_endpoint(
             detail=f"Notifiable class with ID {class_id} not found"
         )
     
+    class_catalog.invalidate()
     return updated_class
 
 # User location management
 @router.post("/location", status_code=status.HTTP_200_OK)
 async def update_location(
     location: UserLocationUpdate,
-    db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Update the current user's location
     
     This endpoint allows users to update their current geographical location,
-    which is used for receiving relevant alerts.
+    which is used for receiving relevant alerts. Locations are buffered and
+    written in bulk; moves smaller than the reported accuracy aren't written.
     """
-    user_location = update_user_location(
-        db=db,
+    location_buffer.update(
         user_id=current_user.id,
         latitude=location.latitude,
         longitude=location.longitude,
         accuracy=location.accuracy
     )
     
+    # Move the user's live alert subscriptions along
+    alert_hub.move_user(current_user.id, location.latitude, location.longitude)
+    
+    return {"status": "success", "message": "Location updated successfully"}
+
+@router.get("/location", response_model=UserLocationResponse)
+async def get_location(
+    db: AsyncSession = Depends(get_async_read_db_session),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the current user's last known location
+    
+    Positions reported to this process are returned from memory, including
+    ones not written to the database yet.
+    """
+    latest = location_buffer.get(current_user.id)
+    if latest is not None:
+        return latest
+    
+    user_location = await get_user_location_async(db, current_user.id)
     if not user_location:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update location"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No location recorded for this user"
         )
-    
-    return {"status": "success", "message": "Location updated successfully"}
+    return user_location
 
 # Alert creation and querying
 @router.post("/create", response_model=AlertResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_alert(
     alert_data: AlertCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -180,7 +221,7 @@ async def create_new_alert(
     that they detect in their vicinity.
     """
     # Check if the notifiable class exists and is active
-    notifiable_class = get_notifiable_class_by_id(db, alert_data.class_id)
+    notifiable_class = await class_catalog.get_by_id(alert_data.class_id)
     
     if not notifiable_class:
         raise HTTPException(
@@ -201,19 +242,15 @@ async def create_new_alert(
             detail=f"Confidence ({alert_data.confidence}) is below the required threshold ({notifiable_class.min_confidence}) for this class"
         )
     
-    # Set expiration time (default: 1 hour from now)
-    expires_at = datetime.utcnow() + timedelta(hours=1)
-    
-    # Create the alert
-    alert = create_alert(
+    # Create the alert and announce it to nearby clients
+    alert = await ingest_alert(
         db=db,
         user_id=current_user.id,
-        class_id=alert_data.class_id,
+        notifiable_class=notifiable_class,
         latitude=alert_data.latitude,
         longitude=alert_data.longitude,
         confidence=alert_data.confidence,
-        device_id=alert_data.device_id,
-        expires_at=expires_at
+        device_id=alert_data.device_id
     )
     
     if not alert:
@@ -227,8 +264,9 @@ async def create_new_alert(
 
 @router.get("/nearby", response_model=List[AlertResponse])
 async def get_nearby_alerts(
+    request: Request,
     query: AlertQueryParams = Depends(),
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_read_db_session),
     current_user: User = Depends(get_optional_current_user)
 ):
     """
@@ -239,14 +277,138 @@ async def get_nearby_alerts(
     recent alerts in the user's area.
     
     This endpoint is public and does not require authentication.
+    Responses carry an ETag and may be reused for Cache-Control max-age
+    seconds; send the ETag back in If-None-Match to get 304 Not Modified.
+    """
+    # Recent alerts are answered from the in-memory index without a query
+    if not query.include_expired and live_alert_index.can_serve(query.hours_ago):
+        alerts = live_alert_index.query(
+            latitude=query.latitude,
+            longitude=query.longitude,
+            radius_km=query.radius_km,
+            class_ids=query.class_ids,
+            hours_ago=query.hours_ago
+        )
+    else:
+        async def fetch(latitude: float, longitude: float, radius_km: float):
+            return await get_alerts_in_radius_async(
+                db=db,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                class_ids=query.class_ids,
+                hours_ago=query.hours_ago,
+                include_expired=query.include_expired
+            )
+        
+        if NEARBY_CACHE["enabled"]:
+            # Callers in the same grid cell share one query
+            alerts = await nearby_cache.get_alerts(
+                query.latitude, query.longitude, query.radius_km,
+                query.class_ids, query.hours_ago, query.include_expired, fetch
+            )
+        else:
+            alerts = await fetch(query.latitude, query.longitude, query.radius_km)
+    
+    body = ("[" + ",".join(
+        (alert if isinstance(alert, AlertResponse) else AlertResponse.parse_obj(alert)).json() for alert in alerts
+    ) + "]").encode("utf-8")
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(NEARBY_CACHE['ttl_seconds'])}"}
+    
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/{alert_id}/recipients", response_model=List[AlertRecipient])
+async def get_recipients(
+    alert_id: int,
+    radius_km: float = Query(RECIPIENT_INDEX["radius_km"], gt=0),
+    active_minutes: int = Query(RECIPIENT_INDEX["active_minutes"], gt=0),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    current_user: User = Depends(check_admin_privilege)
+):
     """
-    alerts = get_alerts_in_radius(
+    Get the users to notify about an alert (Admin only)
+    
+    Returns the users whose location was updated within the last
+    active_minutes and is within radius_km of the alert, nearest first.
+    The reporting user is left out.
+    """
+    alert = await get_alert_async(db, alert_id)
+    if not alert:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert not found"
+        )
+    
+    return await get_alert_recipients_async(
         db=db,
-        latitude=query.latitude,
-        longitude=query.longitude,
-        radius_km=query.radius_km,
-        class_ids=query.class_ids,
-        hours_ago=query.hours_ago
+        latitude=alert.latitude,
+        longitude=alert.longitude,
+        radius_km=radius_km,
+        active_after=datetime.utcnow() - timedelta(minutes=active_minutes),
+        exclude_user_id=alert.user_id
     )
+
+@router.websocket("/subscribe")
+async def subscribe_to_alerts(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Receive new alerts near a location as they are created
+    
+    Authenticate with a bearer token in the Authorization header or the token
+    query parameter. Then send a JSON message with latitude, longitude,
+    radius_km and optionally class_ids; send another one whenever the device
+    moves. Each message also updates the user's stored location. The server
+    sends {"type": "subscribed", ...} after each location message and
+    {"type": "alert", "alert": {...}} for every new alert in the area.
+    """
+    if token is None:
+        authorization = websocket.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    
+    async with AsyncSessionLocal() as db:
+        user = await get_user_from_token(db, token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     
-    return alerts
\ No newline at end of file
+    await websocket.accept()
+    subscriber = alert_hub.subscribe(websocket, user.id)
+    sender = asyncio.create_task(alert_hub.run_sender(subscriber))
+    try:
+        while True:
+            try:
+                subscription = AlertSubscription.parse_obj(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                alert_hub.send(subscriber, {"type": "error", "detail": str(e)})
+                continue
+            
+            alert_hub.locate(
+                subscriber,
+                subscription.latitude,
+                subscription.longitude,
+                subscription.radius_km,
+                subscription.class_ids
+            )
+            
+            location_buffer.update(
+                user_id=user.id,
+                latitude=subscription.latitude,
+                longitude=subscription.longitude,
+                accuracy=subscription.accuracy
+            )
+            
+            alert_hub.send(subscriber, {
+                "type": "subscribed",
+                "latitude": subscription.latitude,
+                "longitude": subscription.longitude,
+                "radius_km": subscription.radius_km
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        alert_hub.unsubscribe(subscriber)
+        sender.cancel()
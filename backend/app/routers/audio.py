@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, status
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, BackgroundTasks, Query, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 import uuid
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
-from app.models.sound import PredictionResponse, EvaluationRequest
+from app.models.sound import PredictionResponse, EvaluationRequest, BulkEvaluationRequest
 from app.model import is_model_ready, get_predictions
-from app.utils import save_upload_file, cleanup_file, find_audio_file_by_name, move_to_evaluated
-from app.database import get_db_session, add_prediction, add_evaluation, get_evaluation_stats, get_latest_predictions, get_db, User
+from app.utils import save_upload_file, cleanup_file, register_upload, remove_files, find_audio_file_by_name, move_to_evaluated, stream_json_page, preserve_evaluated_files
+from app.database import get_db_session, get_async_db_session, get_read_db_session, add_evaluation, add_evaluations_bulk, get_evaluation_stats, get_latest_predictions, get_db, User
 from app.config import ALLOWED_EXTENSIONS, UPLOAD_DIR
-from app.auth import get_current_active_user, check_admin_privilege
+from app.auth import get_current_active_user, check_admin_privilege, get_optional_current_user
+from app.prediction_log import prediction_writer
+from app.alert_ingest import alert_from_prediction
 
 router = APIRouter(
     prefix="/audio",
@@ -23,13 +26,21 @@ logger = logging.getLogger("sound-api")
 
 @router.post("/predict", response_model=PredictionResponse)
 async def predict_sound(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db_session)
-) -> Dict[str, Dict[str, float]]:
+    latitude: Optional[float] = Form(None, ge=-90, le=90),
+    longitude: Optional[float] = Form(None, ge=-180, le=180),
+    device_id: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db_session),
+    current_user: Optional[User] = Depends(get_optional_current_user)
+) -> Dict[str, Any]:
     """
     Process an uploaded .wav file and return classification predictions
     
-    No authentication required for this endpoint.
+    No authentication required for this endpoint. Authenticated users can also
+    send latitude, longitude and device_id: if the top class is an active
+    notifiable class above its min_confidence, an alert is created as with
+    /alerts/create and returned in the response.
     """
     # Check if model is ready
     if not is_model_ready():
@@ -63,10 +74,9 @@ async def predict_sound(
         highest_class_name = highest_class[0]
         highest_confidence = highest_class[1]
         
-        # Save to database (without user_id as no authentication is required)
-        add_prediction(
-            db=db,
-            user_id=None,
+        # Queue for the database writer
+        prediction_writer.submit(
+            user_id=current_user.id if current_user else None,
             file_name=file.filename,
             file_path=file_path,
             highest_class=highest_class_name,
@@ -74,16 +84,35 @@ async def predict_sound(
             all_predictions=predictions
         )
         
-        # Clean up the file
-        cleanup_file(file_path)
+        # Register the file and delete evicted old files after the response is sent
+        evicted_files = register_upload(file_path, file.filename)
+        if evicted_files:
+            background_tasks.add_task(remove_files, evicted_files)
         logger.info(f"File managed: {file_path}")
         
-        return {"predictions": predictions}
+        # Raise an alert right away instead of waiting for the client to call /alerts/create
+        alert = None
+        if current_user is not None and latitude is not None and longitude is not None and device_id:
+            try:
+                alert = await alert_from_prediction(
+                    db=db,
+                    user_id=current_user.id,
+                    class_name=highest_class_name,
+                    confidence=highest_confidence,
+                    latitude=latitude,
+                    longitude=longitude,
+                    device_id=device_id
+                )
+            except Exception as e:
+                # The predictions are still returned; the client can create the alert itself
+                logger.error(f"Error creating alert from prediction: {str(e)}")
+        
+        return {"predictions": predictions, "alert": alert}
     
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         if os.path.exists(file_path):
-            cleanup_file(file_path)
+            cleanup_file(file_path, file.filename)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @router.post("/evaluations")
@@ -144,10 +173,63 @@ async def submit_evaluation(
             detail=f"Error submitting evaluation: {str(e)}"
         )
 
+@router.post("/evaluations/bulk")
+async def submit_evaluations_bulk(
+    request: BulkEvaluationRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Submit several user evaluations at once
+    
+    Lets devices that were offline sync their buffered evaluations in a single
+    request. All evaluations are stored with one multi-row insert; audio files
+    of successful evaluations are preserved in the background.
+    No authentication required for this endpoint.
+    """
+    rows = []
+    for index, evaluation in enumerate(request.evaluations):
+        try:
+            recording_date = datetime.fromisoformat(evaluation.recording_date)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Evaluation {index} has an invalid recording_date: {evaluation.recording_date}"
+            )
+        
+        rows.append({
+            "user_id": None,
+            "device_id": evaluation.device_id,
+            "recording_date": recording_date,
+            "recording_name": evaluation.recording_name,
+            "detection_class": evaluation.detection_class,
+            "detection_confidence": evaluation.detection_confidence,
+            "success": evaluation.success
+        })
+    
+    saved = add_evaluations_bulk(db, rows)
+    if not saved:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to save evaluations to database"
+        )
+    
+    # Only files of successful evaluations are kept, as with single submissions
+    successful_names = [evaluation.recording_name for evaluation in request.evaluations if evaluation.success]
+    if successful_names:
+        background_tasks.add_task(preserve_evaluated_files, successful_names)
+    
+    return {
+        "status": "success",
+        "message": f"{saved} evaluations submitted successfully",
+        "count": saved,
+        "files_to_preserve": len(successful_names)
+    }
+
 @router.get("/evaluations/stats")
 async def get_evaluation_statistics(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_read_db_session)
 ):
     """
     Get statistics about user evaluations
@@ -175,29 +257,34 @@ async def get_evaluation_statistics(
 
 @router.get("/predictions")
 async def get_predictions_list(
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_read_db_session)
 ):
     """
     Get a list of the latest predictions
     
     This endpoint returns the most recent predictions made by the model,
-    up to the specified limit (default 100)
+    newest first, up to the specified limit (default 100). To get the next
+    page, pass the returned next_after_id as after_id.
     """
     try:
-        predictions = get_latest_predictions(db, limit=limit)
+        predictions = get_latest_predictions(db, limit=limit, after_id=after_id)
         
         if predictions is None:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to retrieve predictions from database"
             )
-            
-        return {
-            "count": len(predictions),
-            "predictions": predictions
-        }
+        
+        next_after_id = predictions[-1]["id"] if len(predictions) == limit else None
+        return stream_json_page(
+            "predictions",
+            predictions,
+            count=len(predictions),
+            next_after_id=next_after_id
+        )
         
     except Exception as e:
         logger.error(f"Error retrieving predictions: {str(e)}")
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
+from typing import Optional
 
 from app.models.auth import Token, UserCreate, UserResponse, UserPrivilegeUpdate, UserUpdate, UserDeleteResponse
-from app.auth import authenticate_user, create_access_token, get_current_active_user, check_admin_privilege
-from app.database import get_db_session, User, get_user_by_username, get_user_by_email, get_user_by_id, create_user, update_user, delete_user
+from app.auth import authenticate_user_async, create_access_token, get_current_active_user, check_admin_privilege
+from app.password_hashing import password_hasher, PasswordHasherBusy
+from app.database import get_db_session, get_async_db_session, User, get_user_by_username, get_user_by_email, get_user_by_id, create_user, update_user, delete_user, set_user_privilege, get_users_page
 from app.config import ACCESS_TOKEN_EXPIRE_MINUTES, UserPrivilege
+from app.utils import stream_json_page
 
 router = APIRouter(
     prefix="/auth",
@@ -16,10 +20,18 @@ router = APIRouter(
 
 logger = logging.getLogger("sound-api")
 
+def raise_hasher_busy():
+    """Reject a request when the password hashing queue is full"""
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    database: Session = Depends(get_db_session)
+    database: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Authenticate user and provide JWT token
@@ -28,7 +40,10 @@ async def login_for_access_token(
     and returning a JWT token if authentication is successful.
     """
     # Authenticate user
-    user = authenticate_user(database, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user_async(database, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise_hasher_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,12 +87,19 @@ async def register_user(
             detail="Email already registered"
         )
     
+    # Hash the password off the event loop
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise_hasher_busy()
+    
     # Create new user
     user = create_user(
         db=database,
         username=user_data.username,
         email=user_data.email,
-        password=user_data.password
+        password=None,
+        hashed_password=hashed_password
     )
     
     if not user:
@@ -116,19 +138,28 @@ async def read_user(
         )
     return user
 
-@router.get("/users", response_model=list[UserResponse])
+@router.get("/users")
 async def get_all_users(
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = None,
     database: Session = Depends(get_db_session),
     current_user: User = Depends(check_admin_privilege)
 ):
     """
-    Get all users (admin only)
+    Get users page by page (admin only)
     
-    This endpoint allows administrators to retrieve a list of all users.
+    This endpoint allows administrators to retrieve the list of users, ordered by ID.
+    To get the next page, pass the returned next_after_id as after_id.
     """
     try:
-        users = database.query(User).all()
-        return users
+        users = get_users_page(database, limit=limit, after_id=after_id)
+        next_after_id = users[-1]["id"] if len(users) == limit else None
+        return stream_json_page(
+            "users",
+            users,
+            count=len(users),
+            next_after_id=next_after_id
+        )
     except Exception as e:
         logger.error(f"Error retrieving users: {str(e)}")
         raise HTTPException(
@@ -171,9 +202,12 @@ async def update_user_privilege(
         )
     
     # Update user privilege
-    user.privilege = privilege_data.privilege
-    database.commit()
-    database.refresh(user)
+    user = set_user_privilege(database, user_id, privilege_data.privilege)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update user privilege"
+        )
     
     return user
 
@@ -204,12 +238,17 @@ async def update_user_info(
                 detail="Only super admins can modify super admin accounts"
             )
             
+        # Hash the new password off the event loop
+        hashed_password = None
+        if user_data.password is not None:
+            hashed_password = await password_hasher.hash(user_data.password)
+            
         updated_user = update_user(
             db=database,
             user_id=user_id,
             username=user_data.username,
             email=user_data.email,
-            password=user_data.password
+            hashed_password=hashed_password
         )
         
         if not updated_user:
@@ -224,6 +263,8 @@ async def update_user_info(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(ve)
         )
+    except PasswordHasherBusy:
+        raise_hasher_busy()
     except Exception as e:
         logger.error(f"Error updating user: {str(e)}")
         raise HTTPException(
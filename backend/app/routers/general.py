@@ -3,6 +3,19 @@ import logging
 from app.model import is_model_ready, load_model, get_model_input_shape
 from app.utils import inspect_model
 from app.config import MODEL_PATH, DEBUG_MODE, UPLOAD_DIR
+from app.auth import check_admin_privilege
+from app.database import User
+from app.user_cache import user_cache
+from app.password_hashing import password_hasher
+from app.prediction_log import prediction_writer
+from app.upload_index import upload_index
+from app.read_routing import read_router
+from app.alert_index import live_alert_index
+from app.alert_reaper import alert_reaper
+from app.alert_subscriptions import alert_hub
+from app.class_catalog import class_catalog
+from app.location_buffer import location_buffer
+from app.nearby_cache import nearby_cache
 
 router = APIRouter(tags=["general"])
 
@@ -62,4 +75,23 @@ async def debug_status():
         "debug_mode": DEBUG_MODE,
         "upload_dir": UPLOAD_DIR,
         "message": "Debug mode is enabled - uploaded files will be preserved" if DEBUG_MODE else "Debug mode is disabled - uploaded files will be deleted after processing"
-    }
\ No newline at end of file
+    }
+
+@router.get("/runtime-stats")
+async def runtime_stats(current_user: User = Depends(check_admin_privilege)):
+    """
+    Get in-process cache and queue statistics (admin only)
+    """
+    return {
+        "user_cache": user_cache.get_stats(),
+        "password_hashing": password_hasher.get_stats(),
+        "prediction_log": prediction_writer.get_stats(),
+        "upload_index": upload_index.get_stats(),
+        "read_routing": read_router.get_stats(),
+        "alert_index": live_alert_index.get_stats(),
+        "alert_reaper": alert_reaper.get_stats(),
+        "alert_subscriptions": alert_hub.get_stats(),
+        "class_catalog": class_catalog.get_stats(),
+        "location_buffer": location_buffer.get_stats(),
+        "nearby_cache": nearby_cache.get_stats()
+    }
@@ -165,8 +165,20 @@ async def get_training_status(
         "details": task.get("details")
     }
 
-async def run_training_task(task_id, audio_files, class_indices, class_names, output_model_name=None, epochs=100, batch_size=8):
-    """Background task for model training"""
+def report_training_progress(task_id, stage, done, total):
+    """Record the progress of a training stage in the task status"""
+    task = training_tasks[task_id]
+    task["message"] = f"{stage.capitalize()}: {done}/{total}"
+    task["details"] = dict(task.get("details") or {}, progress={"stage": stage, "done": done, "total": total})
+
+def run_training_task(task_id, audio_files, class_indices, class_names, output_model_name=None, epochs=100, batch_size=8):
+    """
+    Background task for model training
+    
+    This is a plain function, so it runs in the threadpool and status requests
+    keep being answered while it works.
+    """
+    trainer = None
     try:
         logger.info(f"Starting training task {task_id} with {len(audio_files)} audio files for {len(class_names)} classes")
         training_tasks[task_id]["status"] = "processing"
@@ -174,7 +186,11 @@ async def run_training_task(task_id, audio_files, class_indices, class_names, ou
         # Create the trainer with the provided class names
         model_path = output_model_name if output_model_name else f"sound_classifier_{uuid.uuid4()}.h5"
         model_path = os.path.join(BASE_DIR, model_path)
-        trainer = SoundClassificationTrainer(class_names, model_output_path=model_path)
+        trainer = SoundClassificationTrainer(
+            class_names,
+            model_output_path=model_path,
+            progress_callback=lambda stage, done, total: report_training_progress(task_id, stage, done, total)
+        )
         
         # Prepare training data
         success = trainer.prepare_training_data(audio_files, class_indices)
@@ -212,4 +228,8 @@ async def run_training_task(task_id, audio_files, class_indices, class_names, ou
     except Exception as e:
         logger.error(f"Error in training task {task_id}: {str(e)}")
         training_tasks[task_id]["status"] = "failed"
-        training_tasks[task_id]["message"] = f"Training failed: {str(e)}"
\ No newline at end of file
+        training_tasks[task_id]["message"] = f"Training failed: {str(e)}"
+    finally:
+        # Delete the run's memory-mapped images and features
+        if trainer is not None:
+            trainer.release_scratch_files()
\ No newline at end of file
@@ -0,0 +1,144 @@
+import logging
+from io import BytesIO
+from math import ceil
+import numpy as np
+import librosa
+import librosa.display
+import matplotlib
+# Force matplotlib to use 'Agg' backend to avoid issues in server environments
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+
+# Spectrogram rendering for training. This module must not import TensorFlow:
+# the trainer runs render_files_into in spawned worker processes, which only
+# import what they need to unpickle it.
+
+logger = logging.getLogger("sound-api")
+
+# Everything that affects the training spectrograms; cached spectrograms are
+# kept per set of parameters, so bump renderer_version when create_spectrogram changes
+SPECTROGRAM_PARAMS = {
+    "max_duration": 5.0,
+    "sample_rate": 22050,
+    "figsize": 4,
+    "dpi": 150,
+    "image_size": 224,
+    "renderer_version": 1,
+    "librosa_version": librosa.__version__
+}
+
+def split_audio_file(audio_file, max_duration=SPECTROGRAM_PARAMS["max_duration"]):
+    """Split an audio file into chunks of max_duration seconds"""
+    try:
+        y, sr = librosa.load(audio_file, sr=SPECTROGRAM_PARAMS["sample_rate"])
+        duration = librosa.get_duration(y=y, sr=sr)
+
+        # If duration is less than or equal to max_duration, return as is
+        if duration <= max_duration:
+            return [(y, sr)]
+
+        chunks = []
+        samples_per_chunk = int(max_duration * sr)
+
+        # Split the audio into chunks
+        for i in range(0, len(y), samples_per_chunk):
+            chunk = y[i:i + samples_per_chunk]
+            # Only keep the chunk if it's the full length (discard shorter ones)
+            if len(chunk) == samples_per_chunk:
+                chunks.append((chunk, sr))
+
+        return chunks
+    except Exception as e:
+        logger.error(f"Error splitting audio file {audio_file}: {e}")
+        return []
+
+def create_spectrogram(audio_data, sr):
+    """Create a spectrogram from audio data"""
+    try:
+        # Create a figure with a specific figure size
+        figsize = SPECTROGRAM_PARAMS["figsize"]
+        fig = plt.figure(figsize=(figsize, figsize))
+        ax = fig.add_subplot(1, 1, 1)
+        fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
+
+        # Remove axis
+        ax.set_axis_off()
+        ax.set_xticks([])
+        ax.set_yticks([])
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+
+        # Generate mel spectrogram
+        ms = librosa.feature.melspectrogram(y=audio_data, sr=sr)
+        log_ms = librosa.power_to_db(ms, ref=np.max)
+
+        # Display spectrogram
+        librosa.display.specshow(log_ms, sr=sr, ax=ax, x_axis=None, y_axis=None)
+
+        # Save figure to in-memory file
+        buf = BytesIO()
+        fig.savefig(buf, dpi=SPECTROGRAM_PARAMS["dpi"], format='png', bbox_inches='tight', pad_inches=0, transparent=False)
+        plt.close(fig)
+        buf.seek(0)
+
+        # Convert to PIL Image and resize to 224x224
+        img = Image.open(buf)
+
+        # Convert to RGB if needed
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        img = img.resize((SPECTROGRAM_PARAMS["image_size"], SPECTROGRAM_PARAMS["image_size"]))
+
+        # Convert to numpy array
+        img_array = np.array(img)
+
+        return img_array
+    except Exception as e:
+        logger.error(f"Error creating spectrogram: {e}")
+        return None
+
+def estimate_chunk_count(audio_file, max_duration=SPECTROGRAM_PARAMS["max_duration"]):
+    """
+    Upper bound of the number of chunks split_audio_file returns, read from the file header
+
+    Returns 0 if the file can't be read.
+    """
+    try:
+        try:
+            duration = librosa.get_duration(path=audio_file)
+        except TypeError:
+            # librosa < 0.10
+            duration = librosa.get_duration(filename=audio_file)
+        return max(1, ceil(duration / max_duration))
+    except Exception as e:
+        logger.error(f"Error reading duration of audio file {audio_file}: {e}")
+        return 0
+
+def render_files_into(array_path, tasks):
+    """
+    Render the spectrograms of several files into rows of a shared .npy array (process pool worker)
+
+    Args:
+        array_path: Path of the preallocated uint8 array, opened as a shared memory map
+        tasks: List of (file position, audio file, first row, number of rows reserved for the file)
+
+    Returns:
+        List of (file position, number of rows written)
+    """
+    images = np.load(array_path, mmap_mode="r+")
+    written = []
+    for file_index, audio_file, first_row, slots in tasks:
+        count = 0
+        try:
+            for chunk_y, chunk_sr in split_audio_file(audio_file)[:slots]:
+                img_array = create_spectrogram(chunk_y, chunk_sr)
+                if img_array is not None and img_array.shape == images.shape[1:]:
+                    images[first_row + count] = img_array
+                    count += 1
+        except Exception as e:
+            logger.error(f"Error processing audio file {audio_file}: {e}")
+        written.append((file_index, count))
+    images.flush()
+    return written
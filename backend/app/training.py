@@ -1,15 +1,14 @@
 import os
+import sys
 import numpy as np
 import tensorflow as tf
-import matplotlib.pyplot as plt
-import librosa
-import librosa.display
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from PIL import Image
-from io import BytesIO
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import ceil
 from sklearn.model_selection import train_test_split
-from tensorflow.keras.utils import to_categorical
+from tensorflow.keras.utils import Sequence, to_categorical
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
 from tensorflow.keras.layers import Dropout, BatchNormalization, Dense, Flatten
@@ -17,18 +16,82 @@ from tensorflow.keras.regularizers import l2
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 
-from app.config import BASE_DIR
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from app.config import BASE_DIR, TRAINING_CACHE, TRAINING_PREPROCESSING
+from app.configure_tensorflow import configure_tensorflow
+from app.training_cache import ArrayCache, file_content_hash, array_hash
+from app.spectrogram_rendering import (
+    SPECTROGRAM_PARAMS, split_audio_file, create_spectrogram, estimate_chunk_count, render_files_into
+)
 
 # Configure logging
 logger = logging.getLogger("sound-api")
 
+# Before MobileNetV2 or the classifier are built
+configure_tensorflow()
+
+# The frozen feature extractor; cached features are kept per backbone version
+BACKBONE_PARAMS = {
+    "architecture": "mobilenet_v2",
+    "weights": "imagenet",
+    "alpha": 0.75,
+    "input_shape": (224, 224, 3),
+    "tensorflow_version": tf.__version__
+}
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size in MB of this process, or of its finished child processes
+
+    Returns None where the resource module is not available.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+class MappedArraySequence(Sequence):
+    """
+    Feeds batches from (memory-mapped) feature arrays to Keras as float32
+
+    Only one batch is read into memory at a time. The training sequence is
+    shuffled every epoch, like fit does for in-memory arrays.
+    """
+
+    def __init__(self, features, labels, batch_size, shuffle=False):
+        super().__init__()
+        self.features = features
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.indices = np.arange(len(features))
+        if shuffle:
+            np.random.shuffle(self.indices)
+
+    def __len__(self):
+        return ceil(len(self.indices) / self.batch_size)
+
+    def __getitem__(self, index):
+        # Sorted indices read the memory map in file order
+        batch = np.sort(self.indices[index * self.batch_size:(index + 1) * self.batch_size])
+        return self.features[batch].astype(np.float32), self.labels[batch]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
 class SoundClassificationTrainer:
     """
     Class to handle the training of sound classification models,
     based on the CNN approach used in the notebook.
     """
     
-    def __init__(self, classes, temp_dir=None, model_output_path=None):
+    def __init__(self, classes, temp_dir=None, model_output_path=None, progress_callback=None):
         """
         Initialize the trainer with class names
         
@@ -36,20 +99,40 @@ class SoundClassificationTrainer:
             classes: List of class names
             temp_dir: Directory to store temporary files (spectrograms)
             model_output_path: Path to save the trained model
+            progress_callback: Optional function called with (stage, done, total) as work progresses
         """
         self.classes = classes
         self.num_classes = len(classes)
         self.temp_dir = temp_dir or os.path.join(BASE_DIR, "temp_train")
         self.model_output_path = model_output_path or os.path.join(BASE_DIR, f"sound_classifier_{self.num_classes}cls.h5")
+        self.progress_callback = progress_callback
+        
+        # Images and features of this run are kept in memory-mapped files here, not in RAM
+        self.scratch_dir = os.path.join(self.temp_dir, f"run_{uuid.uuid4().hex}")
+        self._scratch_files = {}
         
         # Ensure temp directory exists
         os.makedirs(self.temp_dir, exist_ok=True)
         
+        # Spectrograms of files and backbone features of images seen in earlier runs are reused
+        self.spectrogram_cache = ArrayCache(
+            os.path.join(self.temp_dir, "spectrogram_cache"), SPECTROGRAM_PARAMS, np.uint8
+        ) if TRAINING_CACHE["spectrograms"] else None
+        self.feature_cache = ArrayCache(
+            os.path.join(self.temp_dir, "feature_cache"), BACKBONE_PARAMS, np.float16
+        ) if TRAINING_CACHE["features"] else None
+        self.cache_stats = {
+            "files_cached": 0, "files_processed": 0, "chunks_cached": 0, "chunks_processed": 0,
+            "features_cached": 0, "features_extracted": 0
+        }
+        
         # Training dataset
         self.x_train = []
         self.y_train = []
         self.x_test = []
         self.y_test = []
+        self.num_train_samples = 0
+        self.num_test_samples = 0
         
         # Models
         self.base_model = None
@@ -57,76 +140,13 @@ class SoundClassificationTrainer:
         self.train_features = None
         self.test_features = None
         
-    def split_audio_file(self, audio_file, max_duration=5.0):
+    def split_audio_file(self, audio_file, max_duration=SPECTROGRAM_PARAMS["max_duration"]):
         """Split an audio file into chunks of max_duration seconds"""
-        try:
-            y, sr = librosa.load(audio_file)
-            duration = librosa.get_duration(y=y, sr=sr)
-            
-            # If duration is less than or equal to max_duration, return as is
-            if duration <= max_duration:
-                return [(y, sr)]
-                
-            chunks = []
-            samples_per_chunk = int(max_duration * sr)
-            
-            # Split the audio into chunks
-            for i in range(0, len(y), samples_per_chunk):
-                chunk = y[i:i + samples_per_chunk]
-                # Only keep the chunk if it's the full length (discard shorter ones)
-                if len(chunk) == samples_per_chunk:
-                    chunks.append((chunk, sr))
-                    
-            return chunks
-        except Exception as e:
-            logger.error(f"Error splitting audio file {audio_file}: {e}")
-            return []
+        return split_audio_file(audio_file, max_duration)
     
     def create_spectrogram(self, audio_data, sr):
         """Create a spectrogram from audio data"""
-        try:
-            # Create a figure with a specific figure size
-            plt.switch_backend('agg')
-            fig = plt.figure(figsize=(4, 4))
-            ax = fig.add_subplot(1, 1, 1)
-            fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
-            
-            # Remove axis
-            ax.set_axis_off()
-            ax.set_xticks([])
-            ax.set_yticks([])
-            for spine in ax.spines.values():
-                spine.set_visible(False)
-            
-            # Generate mel spectrogram
-            ms = librosa.feature.melspectrogram(y=audio_data, sr=sr)
-            log_ms = librosa.power_to_db(ms, ref=np.max)
-            
-            # Display spectrogram
-            librosa.display.specshow(log_ms, sr=sr, ax=ax, x_axis=None, y_axis=None)
-            
-            # Save figure to in-memory file
-            buf = BytesIO()
-            fig.savefig(buf, dpi=150, format='png', bbox_inches='tight', pad_inches=0, transparent=False)
-            plt.close(fig)
-            buf.seek(0)
-            
-            # Convert to PIL Image and resize to 224x224
-            img = Image.open(buf)
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-                
-            img = img.resize((224, 224))
-            
-            # Convert to numpy array
-            img_array = np.array(img)
-            
-            return img_array
-        except Exception as e:
-            logger.error(f"Error creating spectrogram: {e}")
-            return None
+        return create_spectrogram(audio_data, sr)
     
     def process_audio_file(self, audio_file, label):
         """
@@ -153,14 +173,21 @@ class SoundClassificationTrainer:
             logger.error(f"Error processing audio file {audio_file}: {e}")
             return []
     
-    def process_audio_files(self, audio_files, labels, max_workers=4):
+    def process_audio_files(self, audio_files, labels, max_workers=None):
         """
         Process multiple audio files in parallel
         
+        Files whose spectrograms are in the spectrogram cache are not decoded
+        again. The others are split and rendered by a process pool, in tasks
+        of several files each; workers write their images straight into a
+        preallocated array shared through a memory-mapped file in temp_dir.
+        Newly processed files are added to the cache. Results keep the order
+        of audio_files.
+        
         Args:
             audio_files: List of audio file paths
             labels: List of labels corresponding to each file
-            max_workers: Number of parallel workers
+            max_workers: Number of worker processes (default: TRAINING_PREPROCESSING workers)
             
         Returns:
             List of processed images and labels
@@ -172,34 +199,170 @@ class SoundClassificationTrainer:
             logger.warning("No audio files provided for processing")
             return all_images, all_labels
         
-        logger.info(f"Processing {len(audio_files)} audio files...")
+        # Images of each file, by position in audio_files
+        content_hashes, file_images = self.load_cached_spectrograms(audio_files)
+        pending = [i for i in range(len(audio_files)) if i not in file_images]
         
         try:
-            # Process files in parallel
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit processing tasks
-                future_to_file = {
-                    executor.submit(self.process_audio_file, file, label): (file, label)
-                    for file, label in zip(audio_files, labels)
-                }
-                
-                # Collect results as they complete
-                for future in as_completed(future_to_file):
-                    file, label = future_to_file[future]
-                    try:
-                        results = future.result()
-                        for img, lbl in results:
-                            all_images.append(img)
-                            all_labels.append(lbl)
-                    except Exception as e:
-                        logger.error(f"Error processing {file}: {e}")
+            if pending:
+                file_images.update(self._render_pending_files(audio_files, pending, max_workers))
             
-            logger.info(f"Created {len(all_images)} spectrograms from {len(audio_files)} audio files")
+            self.store_spectrograms(
+                {content_hashes[i]: file_images[i] for i in pending
+                 if content_hashes[i] is not None and file_images.get(i)}
+            )
+            
+            for i, label in enumerate(labels):
+                for img in file_images.get(i, []):
+                    all_images.append(img)
+                    all_labels.append(label)
+            
+            self.cache_stats["files_processed"] = len(pending)
+            self.cache_stats["chunks_processed"] = sum(len(file_images.get(i, [])) for i in pending)
+            logger.info(f"Created {len(all_images)} spectrograms from {len(audio_files)} audio files "
+                        f"({self.cache_stats['chunks_cached']} from cache)")
         except Exception as e:
             logger.error(f"Error in parallel processing: {e}")
         
         return all_images, all_labels
     
+    def _render_pending_files(self, audio_files, pending, max_workers=None):
+        """
+        Render the spectrograms of the files at the given positions with a process pool
+        
+        Args:
+            audio_files: List of audio file paths
+            pending: Positions in audio_files of the files to process
+            max_workers: Number of worker processes
+            
+        Returns:
+            Dictionary of file position -> list of images (rows of the shared array)
+        """
+        max_workers = max_workers or TRAINING_PREPROCESSING["workers"]
+        files_per_task = TRAINING_PREPROCESSING["files_per_task"]
+        
+        # Reserve rows for the most chunks each file can produce
+        tasks = []
+        first_row = 0
+        for i in pending:
+            slots = estimate_chunk_count(audio_files[i])
+            tasks.append((i, audio_files[i], first_row, slots))
+            first_row += slots
+        
+        size = SPECTROGRAM_PARAMS["image_size"]
+        images = self._new_array("spectrograms", (max(first_row, 1), size, size, 3), np.uint8)
+        array_path = images.filename
+        
+        batches = [tasks[start:start + files_per_task] for start in range(0, len(tasks), files_per_task)]
+        first_rows = {i: row for i, _, row, _ in tasks}
+        written = {}
+        done = 0
+        
+        logger.info(f"Processing {len(pending)} audio files with {max_workers} worker processes...")
+        self._report_progress("preprocessing", 0, len(pending))
+        if max_workers <= 1:
+            for batch in batches:
+                written.update(render_files_into(array_path, batch))
+                done += len(batch)
+                self._report_progress("preprocessing", done, len(pending))
+        else:
+            context = multiprocessing.get_context(TRAINING_PREPROCESSING["start_method"])
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                future_to_batch = {executor.submit(render_files_into, array_path, batch): batch for batch in batches}
+                for future in as_completed(future_to_batch):
+                    batch = future_to_batch[future]
+                    try:
+                        written.update(future.result())
+                    except Exception as e:
+                        logger.error(f"Error processing {len(batch)} audio files: {e}")
+                    done += len(batch)
+                    self._report_progress("preprocessing", done, len(pending))
+        
+        return {i: list(images[first_rows[i]:first_rows[i] + count]) for i, count in written.items()}
+    
+    def _report_progress(self, stage, done, total):
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(stage, done, total)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+    
+    def _new_array(self, name, shape, dtype):
+        """Create a memory-mapped .npy array in this run's scratch directory"""
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        path = os.path.join(self.scratch_dir, f"{name}.npy")
+        self._scratch_files[name] = path
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    
+    def release_scratch_files(self, names=None):
+        """
+        Delete temporary arrays of this run
+        
+        Arrays still referenced stay readable until they are dropped.
+        
+        Args:
+            names: Names of the arrays to delete (default: all of them)
+        """
+        for name in list(self._scratch_files if names is None else names):
+            path = self._scratch_files.pop(name, None)
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not delete {path}: {e}")
+        if not self._scratch_files and os.path.isdir(self.scratch_dir):
+            try:
+                os.rmdir(self.scratch_dir)
+            except OSError as e:
+                logger.warning(f"Could not delete {self.scratch_dir}: {e}")
+    
+    def load_cached_spectrograms(self, audio_files):
+        """
+        Look up audio files in the spectrogram cache
+        
+        Args:
+            audio_files: List of audio file paths
+            
+        Returns:
+            Tuple of the content hash of every file (None if unreadable) and a
+            dictionary of file position -> list of cached images for the cached files
+        """
+        cached = {}
+        content_hashes = []
+        for i, audio_file in enumerate(audio_files):
+            content_hash = None
+            if self.spectrogram_cache is not None:
+                try:
+                    content_hash = file_content_hash(audio_file)
+                except OSError as e:
+                    logger.error(f"Error reading audio file {audio_file}: {e}")
+            content_hashes.append(content_hash)
+            
+            images = self.spectrogram_cache.get(content_hash) if content_hash is not None else None
+            if images is not None:
+                cached[i] = images
+        
+        self.cache_stats["files_cached"] = len(cached)
+        self.cache_stats["chunks_cached"] = sum(len(images) for images in cached.values())
+        logger.info(f"Spectrogram cache: {len(cached)} hits, {len(audio_files) - len(cached)} misses")
+        return content_hashes, cached
+    
+    def store_spectrograms(self, images_by_hash):
+        """
+        Add newly created spectrograms to the spectrogram cache
+        
+        Args:
+            images_by_hash: Dictionary of audio content hash -> list of images in chunk order
+        """
+        if self.spectrogram_cache is None or not images_by_hash:
+            return
+        try:
+            self.spectrogram_cache.add(images_by_hash)
+        except Exception as e:
+            # A failed cache write only costs the next run the preprocessing time
+            logger.warning(f"Could not write spectrograms to the cache: {e}")
+    
     def prepare_training_data(self, audio_files, labels):
         """
         Prepare training data from audio files
@@ -220,13 +383,19 @@ class SoundClassificationTrainer:
                 return False
             
             # Split into training and test sets
-            self.x_train, self.x_test, self.y_train, self.y_test = train_test_split(
-                images, labels, stratify=labels, test_size=0.3, random_state=42
+            train_indices, test_indices, self.y_train, self.y_test = train_test_split(
+                np.arange(len(images)), labels, stratify=labels, test_size=0.3, random_state=42
             )
             
-            # Normalize pixel values
-            self.x_train = np.array(self.x_train)
-            self.x_test = np.array(self.x_test)
+            # Copy the images into memory-mapped arrays instead of stacking them in RAM
+            self.x_train = self._new_array("x_train", (len(train_indices),) + images[0].shape, np.uint8)
+            for row, i in enumerate(train_indices):
+                self.x_train[row] = images[i]
+            self.x_test = self._new_array("x_test", (len(test_indices),) + images[0].shape, np.uint8)
+            for row, i in enumerate(test_indices):
+                self.x_test[row] = images[i]
+            self.num_train_samples = len(train_indices)
+            self.num_test_samples = len(test_indices)
             
             # Convert labels to one-hot encoding
             self.y_train = to_categorical(self.y_train, num_classes=self.num_classes)
@@ -237,11 +406,20 @@ class SoundClassificationTrainer:
         except Exception as e:
             logger.error(f"Error preparing training data: {e}")
             return False
+        finally:
+            # The images were copied into x_train/x_test
+            self.release_scratch_files(["spectrograms"])
+            logger.info(f"Peak RSS after preprocessing: {peak_rss_mb()} MB")
     
     def extract_features(self, batch_size=8):
         """
         Extract features using MobileNetV2
         
+        Features of images seen in earlier runs are loaded from the feature
+        cache; MobileNetV2 is only loaded when some images are new. Features
+        are stored as float16 memory-mapped arrays, so cached and fresh runs
+        train on the same values. The images are deleted afterwards.
+        
         Args:
             batch_size: Batch size for feature extraction
             
@@ -249,47 +427,101 @@ class SoundClassificationTrainer:
             Success status (boolean)
         """
         try:
-            # Load base model for feature extraction
-            logger.info("Loading MobileNetV2 for feature extraction...")
-            self.base_model = MobileNetV2(
-                weights='imagenet', 
-                include_top=False, 
-                input_shape=(224, 224, 3),
-                alpha=0.75
-            )
+            self.train_features = self._extract_split_features(self.x_train, "train", batch_size)
+            self.test_features = self._extract_split_features(self.x_test, "test", batch_size)
+            
+            # Only the features are needed from here on
+            self.x_train = None
+            self.x_test = None
+            self.release_scratch_files(["x_train", "x_test"])
+            
+            if self.base_model is not None:
+                # Clear memory
+                self.base_model = None
+                tf.keras.backend.clear_session()
             
-            # Preprocess input data
-            x_train_processed = preprocess_input(self.x_train)
-            x_test_processed = preprocess_input(self.x_test)
-            
-            # Extract features in batches to avoid memory issues
-            logger.info(f"Extracting features for {len(x_train_processed)} training samples...")
-            self.train_features = np.zeros((len(x_train_processed), 7, 7, 1280))
-            for i in range(0, len(x_train_processed), batch_size):
-                end = min(i + batch_size, len(x_train_processed))
-                batch = x_train_processed[i:end]
-                self.train_features[i:end] = self.base_model.predict(batch, batch_size=batch_size)
-                if (i + batch_size) % 100 == 0 or end == len(x_train_processed):
-                    logger.info(f"Processed {end}/{len(x_train_processed)} - {end/len(x_train_processed)*100:.1f}%")
-            
-            logger.info(f"Extracting features for {len(x_test_processed)} test samples...")
-            self.test_features = np.zeros((len(x_test_processed), 7, 7, 1280))
-            for i in range(0, len(x_test_processed), batch_size):
-                end = min(i + batch_size, len(x_test_processed))
-                batch = x_test_processed[i:end]
-                self.test_features[i:end] = self.base_model.predict(batch, batch_size=batch_size)
-                if (i + batch_size) % 100 == 0 or end == len(x_test_processed):
-                    logger.info(f"Processed {end}/{len(x_test_processed)} - {end/len(x_test_processed)*100:.1f}%")
-            
-            # Clear memory
-            tf.keras.backend.clear_session()
-            
-            logger.info("Feature extraction completed")
+            logger.info(f"Peak RSS after feature extraction: {peak_rss_mb()} MB")
+            
+            logger.info(f"Feature extraction completed ({self.cache_stats['features_cached']} from cache, "
+                        f"{self.cache_stats['features_extracted']} extracted)")
             return True
         except Exception as e:
             logger.error(f"Error extracting features: {e}")
             return False
     
+    def _extract_split_features(self, images, split_name, batch_size, cache_write_size=512):
+        """
+        Get the backbone features of a set of images, from the feature cache or MobileNetV2
+        
+        Args:
+            images: Array of spectrogram images
+            split_name: Name of the split ("train" or "test"), used for the feature array and log messages
+            batch_size: Batch size for feature extraction
+            cache_write_size: New features written to the cache per shard
+            
+        Returns:
+            Memory-mapped float16 array of features, one 7x7x1280 entry per image
+        """
+        features = self._new_array(f"{split_name}_features", (len(images), 7, 7, 1280), np.float16)
+        
+        pending = []
+        hashes = []
+        for i, image in enumerate(images):
+            image_hash = array_hash(image)
+            hashes.append(image_hash)
+            cached = self.feature_cache.get(image_hash) if self.feature_cache is not None else None
+            if cached:
+                features[i] = cached[0]
+            else:
+                pending.append(i)
+        
+        self.cache_stats["features_cached"] += len(images) - len(pending)
+        self.cache_stats["features_extracted"] += len(pending)
+        if not pending:
+            logger.info(f"Loaded features for all {len(images)} {split_name} samples from the cache")
+            return features
+        
+        if self.base_model is None:
+            # Load base model for feature extraction
+            logger.info("Loading MobileNetV2 for feature extraction...")
+            self.base_model = MobileNetV2(
+                weights=BACKBONE_PARAMS["weights"],
+                include_top=False,
+                input_shape=BACKBONE_PARAMS["input_shape"],
+                alpha=BACKBONE_PARAMS["alpha"]
+            )
+        
+        # Extract features in batches to avoid memory issues
+        logger.info(f"Extracting features for {len(pending)} {split_name} samples "
+                    f"({len(images) - len(pending)} cached)...")
+        new_features = {}
+        for start in range(0, len(pending), batch_size):
+            indices = pending[start:start + batch_size]
+            batch = preprocess_input(np.array([images[i] for i in indices], dtype=np.float32))
+            batch_features = self.base_model.predict(batch, batch_size=batch_size).astype(np.float16)
+            for i, feature in zip(indices, batch_features):
+                features[i] = feature
+                new_features[hashes[i]] = [feature]
+            
+            end = start + len(indices)
+            if len(new_features) >= cache_write_size or end == len(pending):
+                self._store_features(new_features)
+                new_features = {}
+            if (start + batch_size) % 100 == 0 or end == len(pending):
+                logger.info(f"Processed {end}/{len(pending)} - {end/len(pending)*100:.1f}%")
+                self._report_progress(f"extracting {split_name} features", end, len(pending))
+        
+        return features
+    
+    def _store_features(self, features_by_hash):
+        """Add newly extracted features to the feature cache"""
+        if self.feature_cache is None or not features_by_hash:
+            return
+        try:
+            self.feature_cache.add(features_by_hash)
+        except Exception as e:
+            logger.warning(f"Could not write features to the cache: {e}")
+    
     def build_model(self):
         """
         Build classification model
@@ -359,11 +591,10 @@ class SoundClassificationTrainer:
                 min_lr=0.00001
             )
             
-            # Train the model
+            # Train the model, reading batches from the memory-mapped features
             history = self.model.fit(
-                self.train_features, self.y_train,
-                validation_data=(self.test_features, self.y_test),
-                batch_size=batch_size,
+                MappedArraySequence(self.train_features, self.y_train, batch_size, shuffle=True),
+                validation_data=MappedArraySequence(self.test_features, self.y_test, batch_size),
                 epochs=epochs,
                 callbacks=[early_stopping, reduce_lr],
                 verbose=1
@@ -374,8 +605,9 @@ class SoundClassificationTrainer:
             logger.info(f"Model saved to {self.model_output_path}")
             
             # Evaluate the model
-            evaluation = self.model.evaluate(self.test_features, self.y_test)
+            evaluation = self.model.evaluate(MappedArraySequence(self.test_features, self.y_test, batch_size))
             logger.info(f"Test loss: {evaluation[0]}, Test accuracy: {evaluation[1]}")
+            logger.info(f"Peak RSS after training: {peak_rss_mb()} MB")
             
             return history
         except Exception as e:
@@ -408,23 +640,27 @@ class SoundClassificationTrainer:
             final_val_acc = val_acc[-1]
             
             # Test accuracy from evaluation
-            test_loss, test_acc = self.model.evaluate(self.test_features, self.y_test, verbose=0)
+            test_sequence = MappedArraySequence(self.test_features, self.y_test, batch_size=32)
+            test_loss, test_acc = self.model.evaluate(test_sequence, verbose=0)
             
             # Get confusion matrix data
-            y_pred = self.model.predict(self.test_features)
+            y_pred = self.model.predict(test_sequence)
             y_pred_classes = np.argmax(y_pred, axis=1)
             y_true_classes = np.argmax(self.y_test, axis=1)
             
             # Create report
             report = {
                 "classes": self.classes,
-                "num_training_samples": len(self.x_train),
-                "num_test_samples": len(self.x_test),
+                "num_training_samples": self.num_train_samples,
+                "num_test_samples": self.num_test_samples,
                 "num_epochs": final_epoch,
                 "training_accuracy": float(final_train_acc),
                 "validation_accuracy": float(final_val_acc),
                 "test_accuracy": float(test_acc),
-                "model_path": self.model_output_path
+                "model_path": self.model_output_path,
+                "preprocessing_cache": self.cache_stats,
+                "peak_rss_mb": peak_rss_mb(),
+                "peak_rss_workers_mb": peak_rss_mb(children=True)
             }
             
             logger.info(f"Training report generated with test accuracy: {test_acc:.4f}")
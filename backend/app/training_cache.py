@@ -0,0 +1,149 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("sound-api")
+
+# Serializes index updates of training runs in the same process
+_index_lock = threading.Lock()
+
+def file_content_hash(path, block_size=1 << 20):
+    """
+    SHA-1 of a file's contents, so renamed or re-uploaded copies of a clip share cache entries
+
+    Args:
+        path: Path to the file
+        block_size: Bytes read at a time
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def array_hash(array):
+    """
+    SHA-1 of an array's contents
+
+    Args:
+        array: Numpy array
+
+    Returns:
+        Hex digest string
+    """
+    return hashlib.sha1(np.ascontiguousarray(array).tobytes()).hexdigest()
+
+class ArrayCache:
+    """
+    Persistent cache of training arrays (spectrograms, backbone features), keyed by content hash.
+
+    Each key maps to a list of equally shaped arrays, e.g. the spectrograms
+    of the chunks of one audio file. Each set of parameters gets its own
+    directory, so changing them never returns stale arrays. Arrays are
+    stored in .npy shards (one per add call) and read back memory-mapped;
+    index.json maps each key to the shard and row of each of its arrays.
+    """
+
+    def __init__(self, cache_dir, params, dtype):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Root directory of the cache
+            params: Dictionary of everything that affects the cached arrays (e.g. rendering settings, versions)
+            dtype: Numpy dtype the arrays are stored as
+        """
+        self.dtype = np.dtype(dtype)
+        params_key = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.directory = os.path.join(cache_dir, params_key)
+        self.index_path = os.path.join(self.directory, "index.json")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._index = self._read_index()
+        self._shards = {}  # shard name -> memory-mapped array
+
+    def get(self, content_hash):
+        """
+        Get the cached arrays of a key
+
+        Args:
+            content_hash: Content hash the arrays were stored under
+
+        Returns:
+            List of memory-mapped arrays in order, or None if the key isn't cached
+        """
+        entries = self._index.get(content_hash)
+        if entries is None:
+            return None
+        try:
+            return [self._open_shard(shard)[row] for shard, row in entries]
+        except (OSError, ValueError, IndexError) as e:
+            logger.warning(f"Training cache entry {content_hash} is unreadable, recomputing: {e}")
+            return None
+
+    def add(self, arrays_by_hash):
+        """
+        Store the arrays of several keys in a new shard
+
+        Args:
+            arrays_by_hash: Dictionary of content hash -> list of arrays in order
+                (a key without arrays is cached as an empty list)
+        """
+        arrays_by_hash = {content_hash: arrays for content_hash, arrays in arrays_by_hash.items()
+                          if content_hash not in self._index}
+        count = sum(len(arrays) for arrays in arrays_by_hash.values())
+        entries = {}
+
+        if count:
+            shard = f"{uuid.uuid4().hex}.npy"
+            first = next(arrays[0] for arrays in arrays_by_hash.values() if arrays)
+            tmp_path = os.path.join(self.directory, f".{shard}.tmp")
+            # Write rows straight into the file instead of stacking them in memory first
+            shard_array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(count,) + first.shape)
+            row = 0
+            for content_hash, arrays in arrays_by_hash.items():
+                entries[content_hash] = []
+                for array in arrays:
+                    shard_array[row] = array
+                    entries[content_hash].append((shard, row))
+                    row += 1
+            shard_array.flush()
+            del shard_array
+            os.replace(tmp_path, os.path.join(self.directory, shard))
+
+        for content_hash, arrays in arrays_by_hash.items():
+            if not arrays:
+                entries[content_hash] = []
+
+        if entries:
+            with _index_lock:
+                # Merge with entries other runs may have written meanwhile
+                index = self._read_index()
+                index.update(entries)
+                tmp_index = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_index, "w") as f:
+                    json.dump(index, f)
+                os.replace(tmp_index, self.index_path)
+            self._index = index
+
+    def _open_shard(self, shard):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(os.path.join(self.directory, shard), mmap_mode="r")
+        return self._shards[shard]
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return {content_hash: [tuple(entry) for entry in entries] for content_hash, entries in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Training cache index {self.index_path} is corrupt, starting over: {e}")
+            return {}
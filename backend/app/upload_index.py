@@ -0,0 +1,116 @@
+import os
+import glob
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+from app.config import UPLOAD_DIR, MAX_AUDIO_FILES
+
+logger = logging.getLogger("sound-api")
+
+def safe_recording_name(recording_name: str) -> str:
+    """Strip characters that are not safe to use in a file name"""
+    return "".join(c for c in recording_name if c.isalnum() or c in "._- ")
+
+class UploadIndex:
+    """
+    In-memory index of the audio clips retained in the uploads directory.
+
+    Clips are kept in insertion order (oldest first) so the oldest clip can be
+    evicted in O(1), and are also keyed by recording name for O(1) lookups.
+    The directory is scanned only once, when the index is rebuilt at startup.
+    """
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+        self._files = OrderedDict()  # file path -> recording name key
+        self._by_name = {}           # recording name key -> file path
+        self._lock = threading.Lock()
+
+    def rebuild(self) -> int:
+        """Rebuild the index from the files currently in the directory"""
+        audio_files = glob.glob(os.path.join(self.directory, "*.wav"))
+        audio_files.sort(key=lambda x: os.path.getctime(x))
+
+        with self._lock:
+            self._files.clear()
+            self._by_name.clear()
+            # Original recording names are not known for files from a previous run,
+            # so they can only be found by their stored file name
+            for file_path in audio_files:
+                self._insert(file_path, os.path.basename(file_path))
+
+        logger.info(f"Upload index rebuilt with {len(audio_files)} files from {self.directory}")
+        return len(audio_files)
+
+    def add(self, file_path: str, recording_name: Optional[str] = None, evict: bool = True) -> List[str]:
+        """
+        Add a clip to the index
+
+        Returns the paths of the oldest clips evicted to stay within max_files.
+        The caller is responsible for deleting them from disk.
+        """
+        name_key = safe_recording_name(recording_name or os.path.basename(file_path))
+
+        with self._lock:
+            if file_path in self._files:
+                self._discard(file_path)
+            self._insert(file_path, name_key)
+
+            evicted = []
+            while evict and len(self._files) > self.max_files:
+                oldest_path = next(iter(self._files))
+                self._discard(oldest_path)
+                evicted.append(oldest_path)
+
+        return evicted
+
+    def remove(self, file_path: str) -> bool:
+        """Remove a clip from the index, returns False if it was not indexed"""
+        with self._lock:
+            if file_path not in self._files:
+                return False
+            self._discard(file_path)
+            return True
+
+    def find(self, recording_name: str, fallback_to_latest: bool = True) -> Optional[str]:
+        """
+        Find a clip by its recording name
+
+        Unless fallback_to_latest is False, falls back to the most recent clip,
+        assuming the lookup is for the latest upload.
+        """
+        name_key = safe_recording_name(recording_name)
+
+        with self._lock:
+            file_path = self._by_name.get(name_key)
+            if file_path is not None:
+                return file_path
+
+            if fallback_to_latest and self._files:
+                most_recent = next(reversed(self._files))
+                logger.info(f"Could not find file by name '{recording_name}', using most recent: {most_recent}")
+                return most_recent
+
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of indexed clips"""
+        with self._lock:
+            return {"files": len(self._files), "max_files": self.max_files}
+
+    def _insert(self, file_path: str, name_key: str) -> None:
+        self._files[file_path] = name_key
+        self._by_name[name_key] = file_path
+
+    def _discard(self, file_path: str) -> None:
+        name_key = self._files.pop(file_path)
+        # Only drop the name mapping if a newer clip has not reused the name
+        if self._by_name.get(name_key) == file_path:
+            del self._by_name[name_key]
+
+# Shared index of the uploads directory, rebuilt by the application lifespan
+upload_index = UploadIndex(UPLOAD_DIR, MAX_AUDIO_FILES)
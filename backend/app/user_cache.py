@@ -0,0 +1,45 @@
+import time
+from typing import Optional, Dict, Any, Callable
+
+from app.cache import TTLCache
+from app.config import USER_CACHE
+from app.models import User
+
+class UserCache:
+    """
+    Cache of authenticated user records, keyed by username.
+
+    Entries are detached User objects with their columns loaded. They are
+    invalidated in this process when a user is updated, deleted or has their
+    privilege changed; other worker processes pick up the change once the
+    TTL expires.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._cache = TTLCache(max_entries, ttl_seconds, clock)
+
+    def get(self, username: str) -> Optional[User]:
+        """Get a cached user by username"""
+        return self._cache.get(username)
+
+    def put(self, user: User) -> None:
+        """Cache a user record"""
+        self._cache.set(user.username, user)
+
+    def invalidate(self, user_id: Optional[int] = None, username: Optional[str] = None) -> None:
+        """Drop a user from the cache by ID and/or username"""
+        if username is not None:
+            self._cache.delete(username)
+        if user_id is not None:
+            self._cache.delete_where(lambda _, user: user.id == user_id)
+
+    def clear(self) -> None:
+        """Drop all cached users"""
+        self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit rates"""
+        return self._cache.get_stats()
+
+# Shared cache used by the token dependencies in app.auth
+user_cache = UserCache(USER_CACHE["max_entries"], USER_CACHE["ttl_seconds"])
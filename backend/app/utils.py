@@ -1,13 +1,16 @@
 import os
 import shutil
 from fastapi import UploadFile
+from fastapi.responses import StreamingResponse
 import logging
 import tensorflow as tf
 import json
-import glob
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
 import time
 
+from app.upload_index import upload_index, safe_recording_name
+
 logger = logging.getLogger("sound-api")
 
 async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
@@ -24,54 +27,67 @@ async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
         logger.error(f"Error saving file: {str(e)}")
         raise e
 
-def cleanup_file(file_path: str) -> None:
+def _json_default(value: Any) -> Any:
+    """Serialize values the json module doesn't handle (datetimes)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def stream_json_page(items_key: str, items: Iterable[Dict[str, Any]], **fields: Any) -> StreamingResponse:
+    """
+    Stream a JSON object with a list of items, encoding one item at a time
+    
+    Produces {**fields, items_key: [...]} without building the whole body in memory
+    """
+    def generate():
+        yield "{"
+        for key, value in fields.items():
+            yield f"{json.dumps(key)}: {json.dumps(value, default=_json_default)}, "
+        yield f"{json.dumps(items_key)}: ["
+        for index, item in enumerate(items):
+            yield ("," if index else "") + json.dumps(item, default=_json_default)
+        yield "]}"
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+def cleanup_file(file_path: str, recording_name: Optional[str] = None) -> None:
     """
     Remove a temporary file unless debug mode is enabled.
     In non-debug mode, manage files to keep the last MAX_AUDIO_FILES.
     """
-    from app.config import DEBUG_MODE, UPLOAD_DIR, MAX_AUDIO_FILES
-    
     try:
         if os.path.exists(file_path):
-            if DEBUG_MODE:
-                logger.info(f"Debug mode enabled - keeping file: {file_path}")
-            else:
-                # Instead of removing, manage the file collection
-                manage_audio_files(file_path)
-                logger.info(f"Successfully managed audio file: {file_path}")
+            evicted = register_upload(file_path, recording_name)
+            remove_files(evicted)
+            logger.info(f"Successfully managed audio file: {file_path}")
     except Exception as e:
         logger.error(f"Error handling file {file_path}: {str(e)}")
 
-def manage_audio_files(new_file_path: str) -> None:
+def register_upload(file_path: str, recording_name: Optional[str] = None) -> List[str]:
     """
-    Manage audio files collection to keep only the last MAX_AUDIO_FILES.
-    When the limit is reached, remove the oldest files first.
+    Add an uploaded file to the upload index.
+    In non-debug mode, returns the oldest files that no longer fit in
+    MAX_AUDIO_FILES; they are not deleted here so that removal can happen
+    off the request path (see remove_files).
     """
-    from app.config import UPLOAD_DIR, MAX_AUDIO_FILES
+    from app.config import DEBUG_MODE
     
-    try:
-        audio_files = glob.glob(os.path.join(UPLOAD_DIR, "*.wav"))
-        
-        # Count current files (excluding the new file if it's already in the list)
-        current_count = len(audio_files)
-        
-        if current_count >= MAX_AUDIO_FILES:
-            # Sort files by creation time (oldest first)
-            audio_files.sort(key=lambda x: os.path.getctime(x))
-            
-            # Calculate how many files to delete
-            files_to_delete = current_count - MAX_AUDIO_FILES + 1  # +1 for the new file
-            
-            # Delete oldest files
-            for i in range(files_to_delete):
-                if i < len(audio_files):
-                    try:
-                        os.remove(audio_files[i])
-                        logger.info(f"Removed oldest audio file: {audio_files[i]}")
-                    except Exception as e:
-                        logger.error(f"Failed to remove old file {audio_files[i]}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error managing audio files: {str(e)}")
+    if DEBUG_MODE:
+        logger.info(f"Debug mode enabled - keeping file: {file_path}")
+    return upload_index.add(file_path, recording_name, evict=not DEBUG_MODE)
+
+def remove_files(file_paths: List[str]) -> None:
+    """
+    Delete files that were evicted from the upload index
+    """
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+            logger.info(f"Removed oldest audio file: {file_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove old file {file_path}: {str(e)}")
 
 def move_to_evaluated(file_path: str, recording_name: str) -> str:
     """
@@ -90,7 +106,7 @@ def move_to_evaluated(file_path: str, recording_name: str) -> str:
         _, ext = os.path.splitext(file_path)
         
         # Create a new filename combining the recording name and timestamp
-        safe_name = "".join(c for c in recording_name if c.isalnum() or c in "._- ")
+        safe_name = safe_recording_name(recording_name)
         new_filename = f"{safe_name}_{timestamp}{ext}"
         
         # Full path to the new file location
@@ -105,36 +121,33 @@ def move_to_evaluated(file_path: str, recording_name: str) -> str:
         logger.error(f"Error moving file to evaluated directory: {str(e)}")
         return None
 
-def find_audio_file_by_name(recording_name: str) -> str:
+def find_audio_file_by_name(recording_name: str, fallback_to_latest: bool = True) -> str:
     """
     Find an audio file in the uploads directory by its recording name
     Returns the file path if found, None otherwise
     """
-    from app.config import UPLOAD_DIR
-    
     try:
-        # Get all audio files in the uploads directory
-        audio_files = glob.glob(os.path.join(UPLOAD_DIR, "*.wav"))
-        
-        # Try to find a filename that contains the recording name
-        safe_name = "".join(c for c in recording_name if c.isalnum() or c in "._- ")
-        
-        for file_path in audio_files:
-            if safe_name in os.path.basename(file_path):
-                return file_path
-        
-        # If not found by name, return the most recently created file
-        # (This is a fallback assuming the evaluation is for the most recent upload)
-        if audio_files:
-            most_recent = max(audio_files, key=os.path.getctime)
-            logger.info(f"Could not find file by name '{recording_name}', using most recent: {most_recent}")
-            return most_recent
-        
-        return None
+        return upload_index.find(recording_name, fallback_to_latest=fallback_to_latest)
     except Exception as e:
         logger.error(f"Error finding audio file by name: {str(e)}")
         return None
 
+def preserve_evaluated_files(recording_names: List[str]) -> int:
+    """
+    Copy the audio files of successfully evaluated recordings to the evaluated directory
+    
+    Only exact name matches are copied, since the most recent upload is unrelated
+    to evaluations submitted in bulk. Returns the number of copied files.
+    """
+    preserved = 0
+    for recording_name in recording_names:
+        file_path = find_audio_file_by_name(recording_name, fallback_to_latest=False)
+        if file_path and move_to_evaluated(file_path, recording_name):
+            preserved += 1
+    
+    logger.info(f"Preserved {preserved} of {len(recording_names)} evaluated audio files")
+    return preserved
+
 def inspect_model(model_path):
     """
     Inspect a saved model and return its metadata
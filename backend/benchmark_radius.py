@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.database import calculate_distance, _alerts_within_radius
+from app.geo import bounding_box
+
+def make_candidates(count, latitude, longitude, radius_km):
+    """
+    Synthetic bounding box candidates, shaped like the rows of alerts_in_radius_query
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    now = datetime.utcnow()
+    return [
+        {
+            "id": i,
+            "class_id": random.randint(1, 5),
+            "latitude": random.uniform(min_lat, max_lat),
+            "longitude": random.uniform(min_lon, max_lon),
+            "confidence": random.random(),
+            "device_id": f"device-{i}",
+            "is_verified": False,
+            "created_at": now
+        }
+        for i in range(count)
+    ]
+
+def per_row_filter(rows, latitude, longitude, radius_km):
+    """
+    The previous approach: one Python Haversine call per candidate, then a sort
+    """
+    results = []
+    for row in rows:
+        distance = calculate_distance(latitude, longitude, row["latitude"], row["longitude"])
+        if distance <= radius_km:
+            results.append(dict(row, distance_km=distance))
+    results.sort(key=lambda alert: alert["distance_km"])
+    return results
+
+def best_time(func, repeat):
+    """
+    Best wall clock time of several runs, in milliseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark(sizes, latitude, longitude, radius_km, repeat):
+    """
+    Time per-row and vectorized distance filtering for each candidate count
+    """
+    print(f"Radius {radius_km} km around ({latitude}, {longitude}), best of {repeat} runs")
+    print(f"{'candidates':>12} {'matches':>9} {'per-row ms':>12} {'vectorized ms':>15} {'speedup':>9}")
+    for size in sizes:
+        rows = make_candidates(size, latitude, longitude, radius_km)
+
+        expected = per_row_filter(rows, latitude, longitude, radius_km)
+        actual = _alerts_within_radius(rows, latitude, longitude, radius_km)
+        assert [alert["id"] for alert in expected] == [alert["id"] for alert in actual], "Results differ"
+
+        per_row_ms = best_time(lambda: per_row_filter(rows, latitude, longitude, radius_km), repeat)
+        vectorized_ms = best_time(lambda: _alerts_within_radius(rows, latitude, longitude, radius_km), repeat)
+        print(f"{size:>12} {len(actual):>9} {per_row_ms:>12.2f} {vectorized_ms:>15.2f} {per_row_ms / vectorized_ms:>8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark alert distance filtering for large candidate sets")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Candidate counts to test")
+    parser.add_argument("--latitude", type=float, default=41.0, help="Latitude of the query point")
+    parser.add_argument("--longitude", type=float, default=29.0, help="Longitude of the query point")
+    parser.add_argument("--radius", type=float, default=5.0, help="Radius in km")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+
+    args = parser.parse_args()
+
+    random.seed(0)
+    run_benchmark(args.sizes, args.latitude, args.longitude, args.radius, args.repeat)
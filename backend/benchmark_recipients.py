@@ -0,0 +1,114 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import RECIPIENT_INDEX
+from app.database import calculate_distance, recipients_query, _recipients_within_radius
+from app.geo import grid_cell
+from app.models import UserLocation
+
+def seed_users(engine, count, latitude, longitude, spread_degrees, stale_fraction):
+    """
+    Create user_locations with count synthetic users spread around a point
+
+    stale_fraction of the users last updated their location a day ago.
+    """
+    UserLocation.__table__.create(engine)
+    now = datetime.utcnow()
+    cell_degrees = RECIPIENT_INDEX["cell_degrees"]
+    with engine.begin() as conn:
+        for start in range(0, count, 50000):
+            rows = []
+            for user_id in range(start + 1, min(start + 50000, count) + 1):
+                user_lat = latitude + random.uniform(-spread_degrees, spread_degrees)
+                user_lon = longitude + random.uniform(-spread_degrees, spread_degrees)
+                rows.append({
+                    "id": user_id,
+                    "user_id": user_id,
+                    "latitude": user_lat,
+                    "longitude": user_lon,
+                    "grid_cell": grid_cell(user_lat, user_lon, cell_degrees),
+                    "last_updated": now - timedelta(days=1) if random.random() < stale_fraction else now
+                })
+            conn.execute(insert(UserLocation), rows)
+
+def full_scan(session, latitude, longitude, radius_km, active_after):
+    """
+    The naive approach: read every location and check each one in Python
+    """
+    results = []
+    for user_id, user_lat, user_lon, last_updated in session.execute(
+        select(UserLocation.user_id, UserLocation.latitude, UserLocation.longitude, UserLocation.last_updated)
+    ):
+        if last_updated < active_after:
+            continue
+        distance = calculate_distance(latitude, longitude, user_lat, user_lon)
+        if distance <= radius_km:
+            results.append({"user_id": user_id, "distance_km": distance})
+    results.sort(key=lambda recipient: recipient["distance_km"])
+    return results
+
+def indexed_lookup(session, latitude, longitude, radius_km, active_after):
+    """
+    Grid cell range scans on ix_user_locations_cell_updated, then a vectorized distance check
+    """
+    rows = session.execute(recipients_query(latitude, longitude, radius_km, active_after)).all()
+    return _recipients_within_radius(rows, latitude, longitude, radius_km)
+
+def best_time(func, repeat):
+    """
+    Best wall clock time of several runs, in milliseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark(database_url, users, latitude, longitude, spread_degrees, radii, repeat):
+    """
+    Time the full scan and the grid lookup for each radius
+    """
+    engine = create_engine(database_url)
+    print(f"Seeding {users} users within +/-{spread_degrees} degrees of ({latitude}, {longitude})...")
+    start = time.perf_counter()
+    seed_users(engine, users, latitude, longitude, spread_degrees, stale_fraction=0.5)
+    print(f"Seeded in {time.perf_counter() - start:.1f} s, best of {repeat} runs")
+
+    active_after = datetime.utcnow() - timedelta(minutes=RECIPIENT_INDEX["active_minutes"])
+    print(f"{'radius km':>10} {'recipients':>11} {'full scan ms':>13} {'grid ms':>9} {'speedup':>9}")
+    with Session(engine) as session:
+        for radius_km in radii:
+            expected = full_scan(session, latitude, longitude, radius_km, active_after)
+            actual = indexed_lookup(session, latitude, longitude, radius_km, active_after)
+            assert [r["user_id"] for r in expected] == [r["user_id"] for r in actual], "Results differ"
+
+            scan_ms = best_time(lambda: full_scan(session, latitude, longitude, radius_km, active_after), repeat)
+            grid_ms = best_time(lambda: indexed_lookup(session, latitude, longitude, radius_km, active_after), repeat)
+            print(f"{radius_km:>10} {len(actual):>11} {scan_ms:>13.1f} {grid_ms:>9.1f} {scan_ms / grid_ms:>8.1f}x")
+    engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark looking up the users to notify around an alert. "
+                    "Uses a throwaway in-memory SQLite database unless --database-url "
+                    "points at an empty scratch database (a user_locations table is created)."
+    )
+    parser.add_argument("--database-url", default="sqlite://", help="SQLAlchemy URL of a scratch database")
+    parser.add_argument("--users", type=int, default=1000000, help="Number of synthetic users")
+    parser.add_argument("--latitude", type=float, default=41.0, help="Latitude of the alert")
+    parser.add_argument("--longitude", type=float, default=29.0, help="Longitude of the alert")
+    parser.add_argument("--spread", type=float, default=1.0, help="Users are placed within this many degrees of the alert")
+    parser.add_argument("--radii", type=float, nargs="+", default=[1.0, 5.0, 20.0], help="Notification radii in km")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+
+    args = parser.parse_args()
+
+    random.seed(0)
+    run_benchmark(args.database_url, args.users, args.latitude, args.longitude, args.spread, args.radii, args.repeat)
@@ -0,0 +1,66 @@
+import sys
+import argparse
+
+from app.config import ALERT_SPATIAL_INDEX
+from app.database import engine, alerts_in_radius_query, evaluation_aggregate_query, latest_predictions_query
+
+def get_hot_queries(latitude, longitude, radius_km):
+    """
+    Representative statements for the query patterns the API runs most
+    """
+    queries = {
+        "alerts in radius (last hour)": alerts_in_radius_query(latitude, longitude, radius_km, hours_ago=1, strategy="bbox"),
+        "alerts in radius (class filter, last hour)": alerts_in_radius_query(latitude, longitude, radius_km, class_ids=[1, 2], hours_ago=1, strategy="bbox"),
+        "alerts in radius (no time window)": alerts_in_radius_query(latitude, longitude, radius_km, strategy="bbox"),
+        "latest predictions": latest_predictions_query(limit=100),
+        "latest predictions (next page)": latest_predictions_query(limit=100, after_id=1000000),
+        "evaluation stats by class": evaluation_aggregate_query(),
+    }
+    # alerts.location only exists with ALERT_RADIUS_STRATEGY=spatial
+    if ALERT_SPATIAL_INDEX:
+        queries["alerts in radius (spatial, last hour)"] = alerts_in_radius_query(latitude, longitude, radius_km, hours_ago=1, strategy="spatial")
+        queries["alerts in radius (spatial, no time window)"] = alerts_in_radius_query(latitude, longitude, radius_km, strategy="spatial")
+    return queries
+
+def explain(conn, statement):
+    """
+    Run EXPLAIN for a statement and return the plan rows as dictionaries
+    """
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    result = conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params)
+    return [dict(row._mapping) for row in result]
+
+def check_query_plans(latitude, longitude, radius_km):
+    """
+    Print the plan of every hot query and return False if any of them
+    reads a table with a full scan (EXPLAIN type ALL without a key)
+    """
+    ok = True
+    with engine.connect() as conn:
+        for name, statement in get_hot_queries(latitude, longitude, radius_km).items():
+            print(f"\n{name}:")
+            for row in explain(conn, statement):
+                full_scan = row.get("type") == "ALL" and not row.get("key")
+                status = "FULL SCAN" if full_scan else "ok"
+                print(f"  [{status}] table={row.get('table')} type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+                if full_scan:
+                    ok = False
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the query plans of the hot queries with EXPLAIN. "
+                    "Run against a database with representative data, since MySQL "
+                    "prefers full scans on near-empty tables."
+    )
+    parser.add_argument("--latitude", type=float, default=41.0, help="Latitude used for the radius queries")
+    parser.add_argument("--longitude", type=float, default=29.0, help="Longitude used for the radius queries")
+    parser.add_argument("--radius", type=float, default=1.0, help="Radius in km used for the radius queries")
+
+    args = parser.parse_args()
+
+    if check_query_plans(args.latitude, args.longitude, args.radius):
+        print("\nAll query plans use indexes.")
+    else:
+        print("\nSome queries use full table scans.")
+        sys.exit(1)
@@ -1,12 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import threading
 
-from app.config import setup_dirs
+from app.config import setup_dirs, ALERT_INDEX
 from app.model import load_model
-from app.database import init_database
+from app.database import init_database, async_engine, async_read_engine
+from app.read_routing import read_router, SAFE_METHODS, LAST_WRITE_HEADER
+from app.prediction_log import prediction_writer
+from app.password_hashing import password_hasher
+from app.upload_index import upload_index
+from app.alert_index import live_alert_index
+from app.alert_reaper import alert_reaper
+from app.alert_subscriptions import alert_hub
+from app.location_buffer import location_buffer
+from app.nearby_cache import nearby_cache
 from app.routers import general_router, auth_router, audio_router, training_router, alerts_router
 
 # Setup logging
@@ -24,6 +34,9 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up the API...")
     setup_dirs()
     
+    # Index retained uploads once instead of scanning the directory per request
+    upload_index.rebuild()
+    
     # Initialize database
     logger.info("Initializing database...")
     database_initialized = init_database()
@@ -32,6 +45,26 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Database initialization failed, evaluation features may not work")
     
+    # Start the background writer for prediction records
+    prediction_writer.start()
+    
+    # Write user locations in bulk instead of once per request
+    location_buffer.start()
+    
+    # Push alerts created by other worker processes to this process's subscribers,
+    # and drop cached /alerts/nearby results around them
+    alert_hub.attach_loop(asyncio.get_running_loop())
+    live_alert_index.add_listener(alert_hub.publish_threadsafe)
+    live_alert_index.add_position_listener(nearby_cache.invalidate_points)
+    
+    # Load recent alerts into memory for /alerts/nearby
+    if ALERT_INDEX["enabled"] and database_initialized:
+        live_alert_index.start()
+    
+    # Move expired alerts out of the alerts table in the background
+    if database_initialized:
+        alert_reaper.start()
+    
     # Start model loading in a background thread
     # This allows the API to start serving requests while the model loads
     global model_loading_task
@@ -45,6 +78,22 @@ async def lifespan(app: FastAPI):
     
     # Shutdown code (runs when app is shutting down)
     logger.info("Shutting down the API...")
+    
+    # Flush predictions and user locations that are still buffered
+    prediction_writer.stop()
+    location_buffer.stop()
+    
+    # Stop syncing the live alert index and archiving expired alerts
+    live_alert_index.stop()
+    alert_reaper.stop()
+    
+    # Stop the password hashing workers
+    password_hasher.shutdown()
+    
+    # Close pooled async connections
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -61,8 +110,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
+# Pin clients to the primary database right after they write, so their
+# following reads don't hit a lagging read replica
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        read_router.mark_write(response)
+    return response
+
 # Global state
 model_loading_lock = threading.Lock()
 model_loading_task = None
@@ -0,0 +1,38 @@
+import argparse
+import logging
+
+from app.database import engine
+from app.models import Base
+from app.migrations import MIGRATIONS, schema_migrations, get_applied_versions, apply_migrations
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()]
+)
+
+def show_status():
+    """
+    Print every known migration and whether it has been applied
+    """
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        applied = get_applied_versions(conn)
+
+    for version, description, _ in MIGRATIONS:
+        status = "applied" if version in applied else "pending"
+        print(f"{version:>4}  {status:<8} {description}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--status", action="store_true", help="Only show which migrations are applied")
+
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    else:
+        # Create missing tables first, the same way the API does at startup
+        Base.metadata.create_all(bind=engine)
+        count = apply_migrations(engine)
+        print(f"Applied {count} migrations.")
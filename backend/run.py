@@ -1,6 +1,5 @@
 import uvicorn
 import os
-import tensorflow as tf
 import logging
 import argparse
 import json
@@ -41,9 +40,6 @@ if __name__ == "__main__":
     if args.debug:
         logger.info("Debug mode enabled - uploaded sound files will be preserved")
     
-    # Import TF configuration from app
-    from app import configure_tensorflow
-    
     # Set TF log level to reduce noise
     os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 0=all, 1=info, 2=warning, 3=error
     
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.alert_subscriptions import AlertSubscriptionHub
+
+class FailingWebSocket:
+    """WebSocket whose client disconnected before the next send"""
+
+    def __init__(self, error):
+        self.error = error
+
+    async def send_text(self, text):
+        raise self.error
+
+@pytest.mark.parametrize("error", [WebSocketDisconnect(code=1006), RuntimeError("Cannot call send once a close message has been sent")])
+def test_sender_unsubscribes_client_that_disconnected_mid_send(error):
+    hub = AlertSubscriptionHub(cell_degrees=0.1, queue_size=10)
+    subscriber = hub.subscribe(FailingWebSocket(error), user_id=1)
+    hub.locate(subscriber, 41.0, 29.0, radius_km=5.0)
+    hub.send(subscriber, {"type": "subscribed"})
+
+    asyncio.run(asyncio.wait_for(hub.run_sender(subscriber), timeout=1))
+
+    stats = hub.get_stats()
+    assert stats["subscribers"] == 0
+    assert stats["cells"] == 0
+    assert stats["send_failures"] == 1
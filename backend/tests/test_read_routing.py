@@ -0,0 +1,36 @@
+from fastapi import Request, Response
+
+from app.read_routing import ReadRouter, LAST_WRITE_COOKIE, LAST_WRITE_HEADER
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def make_request(headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_write_marker_pins_reads_on_another_worker():
+    clock = FakeClock()
+    writer, reader = ReadRouter(5.0, clock), ReadRouter(5.0, clock)
+
+    response = Response()
+    writer.mark_write(response)
+    marker = response.headers[LAST_WRITE_HEADER]
+    assert f"{LAST_WRITE_COOKIE}={marker}" in response.headers["set-cookie"]
+
+    # The next read lands on a different worker process
+    clock.now += 4.9
+    assert not reader.use_replica(make_request({LAST_WRITE_HEADER: marker}))
+    assert not reader.use_replica(make_request({"Cookie": f"{LAST_WRITE_COOKIE}={marker}"}))
+
+    clock.now += 0.1
+    assert reader.use_replica(make_request({LAST_WRITE_HEADER: marker}))
+
+def test_reads_without_a_valid_marker_use_the_replica():
+    router = ReadRouter(5.0, FakeClock())
+    assert router.use_replica(make_request())
+    assert router.use_replica(make_request({LAST_WRITE_HEADER: "not-a-time"}))
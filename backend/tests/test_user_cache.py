@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import USER_CACHE, UserPrivilege
+from app.database import set_user_privilege
+from app.models import User
+from app.user_cache import UserCache, user_cache
+
+class FakeClock:
+    """Monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+    user_cache.clear()
+
+def make_admin(user_id=1, username="alice"):
+    return User(id=user_id, username=username, email=f"{username}@example.com",
+                hashed_password="x", privilege=UserPrivilege.ADMIN)
+
+def test_set_user_privilege_invalidates_cached_user(db):
+    admin = make_admin()
+    db.add(admin)
+    db.commit()
+    user_cache.put(admin)
+    assert user_cache.get("alice") is admin
+
+    updated = set_user_privilege(db, admin.id, UserPrivilege.USER)
+
+    assert updated.privilege == UserPrivilege.USER
+    assert user_cache.get("alice") is None
+
+def test_privilege_changed_by_another_worker_expires_within_ttl():
+    clock = FakeClock()
+    cache = UserCache(max_entries=10, ttl_seconds=USER_CACHE["ttl_seconds"], clock=clock)
+    cache.put(make_admin())
+
+    # Another worker revokes the privilege; this process isn't told and keeps the stale record
+    clock.now += USER_CACHE["ttl_seconds"] - 0.001
+    assert cache.get("alice").privilege == UserPrivilege.ADMIN
+
+    # Once the TTL has passed the record is reloaded from the database
+    clock.now += 0.001
+    assert cache.get("alice") is None